@@ -0,0 +1,59 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """ETag / Last-Modified support for DRF GET views.
+
+    Validators come from one aggregate query (latest modification time and
+    row count) over the view's queryset, so a matching If-None-Match or
+    If-Modified-Since is answered with 304 before anything is serialized.
+    """
+    # Timestamps whose maximum is the resource's modification time, may span relations
+    last_modified_fields = ('updated_at',)
+    # Counted so deletions change the validators too
+    count_field = 'pk'
+
+    def get_validator_queryset(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            # Detail views: just the requested object
+            return self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.filter_queryset(self.get_queryset())
+
+    def get_validators(self):
+        aggregates = {f'max_{i}': Max(field) for i, field in enumerate(self.last_modified_fields)}
+        aggregates['count'] = Count(self.count_field, distinct=True)
+        values = self.get_validator_queryset().order_by().aggregate(**aggregates)
+        count = values.pop('count')
+        timestamps = [value for value in values.values() if value is not None]
+        return (max(timestamps) if timestamps else None), count
+
+    def get_etag(self, request, last_modified, count):
+        raw = '|'.join([
+            request.get_full_path(),
+            request.accepted_media_type or '',
+            str(request.user.pk),
+            last_modified.isoformat() if last_modified else '',
+            str(count),
+        ])
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        # Kept on the view, cached responses are keyed by them too
+        self.validators = last_modified, count = self.get_validators()
+        etag = self.get_etag(request, last_modified, count)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,168 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows, only threads of one process are kept from rendering twice
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_STRIPES = 64
+# Hits refresh a file's mtime at most this often, eviction order doesn't need better
+TOUCH_INTERVAL = 60
+# Eviction frees space down to this share of the limit, so it doesn't run on every miss
+EVICT_TO = 0.9
+
+
+class DerivativeCache:
+    """Resized copies of stored images on local disk, evicted least recently used first.
+
+    Files are named by the hash of their cache key and sharded by its first
+    two characters, recency is the file's mtime. Misses are rendered under a
+    lock striped by key, one flock'd file per stripe across processes, so
+    concurrent requests for the same derivative render it once and the
+    others read the result.
+    """
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._evict_lock = threading.Lock()
+        # Bytes written since the last scan plus what that scan found, None until the first miss
+        self._size = None
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256('\0'.join(map(str, parts)).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def open(self, key):
+        """The cached file for key opened for reading, or None on a miss."""
+        path = self.path(key)
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            if time.time() - os.fstat(file.fileno()).st_mtime > TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+        return file
+
+    def get_or_render(self, key, render):
+        """Open the cached file for key, calling render() for its bytes on a miss.
+
+        Returns a binary file object, in memory if the rendered file was evicted at once.
+        """
+        file = self.open(key)
+        if file is not None:
+            return file
+        with self.lock(key):
+            # Whoever held the lock before us may have rendered it already
+            file = self.open(key)
+            if file is not None:
+                return file
+            content = render()
+            self.write(key, content)
+            # Another process may evict it before we reopen it, the bytes are still at hand
+            file = self.open(key) or io.BytesIO(content)
+        self.added(len(content))
+        return file
+
+    @contextmanager
+    def lock(self, key):
+        stripe = int(key[:8], 16) % LOCK_STRIPES
+        with self._locks[stripe]:
+            if fcntl is None:
+                yield
+                return
+            lock_dir = os.path.join(self.directory, 'locks')
+            os.makedirs(lock_dir, exist_ok=True)
+            with open(os.path.join(lock_dir, f'{stripe}.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def write(self, key, content):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Renamed into place, readers never see a partial file
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix='.tmp-', delete=False) as file:
+            file.write(content)
+        os.replace(file.name, path)
+
+    def added(self, size):
+        with self._evict_lock:
+            if self._size is None:
+                self._size = sum(size for _, _, size in self.scan())
+            else:
+                self._size += size
+            if self._size > self.max_size:
+                self._size = self.evict(int(self.max_size * EVICT_TO))
+
+    def scan(self):
+        """(mtime, path, size) of every cached file."""
+        entries = []
+        try:
+            shards = [entry for entry in os.scandir(self.directory) if entry.is_dir() and len(entry.name) == 2]
+        except FileNotFoundError:
+            return entries
+        for shard in shards:
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def evict(self, target):
+        """Delete the least recently used files until at most target bytes remain, returns the bytes left."""
+        entries = sorted(self.scan())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Still open for a response on platforms that don't allow that
+                logger.warning('Could not evict %s', path)
+                continue
+            total -= size
+        return total
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def source_version(name):
+    """Version of a stored image in its derivative URLs, a new name gets a new version."""
+    return DerivativeCache.make_key(name)[:16]
+
+
+def get_derivative_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DerivativeCache(settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_SIZE)
+    return _cache
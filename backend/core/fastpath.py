@@ -0,0 +1,33 @@
+from django.conf import settings
+from rest_framework import serializers
+
+# Query params that change the serializer output, the fast paths only render the default shape
+SHAPE_PARAMS = ('fields', 'expand')
+
+# Field formatters shared by the fast read paths, built once per process. Using the
+# serializer fields' own to_representation keeps the output identical to the serializers.
+format_datetime = serializers.DateTimeField().to_representation
+
+
+def decimal_formatter(model_field):
+    return serializers.DecimalField(
+        max_digits=model_field.max_digits, decimal_places=model_field.decimal_places
+    ).to_representation
+
+
+def file_url_builder(storage, request):
+    """Return name -> URL exactly as serializers.ImageField renders a stored file."""
+    build_absolute_uri = request.build_absolute_uri if request is not None else None
+
+    def build(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        return build_absolute_uri(url) if build_absolute_uri else url
+    return build
+
+
+def use_fast_read_path(request):
+    if not settings.FAST_READ_PATH:
+        return False
+    return not any(request.query_params.get(param) for param in SHAPE_PARAMS)
@@ -0,0 +1,272 @@
+import base64
+import hashlib
+import io
+import logging
+import multiprocessing
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# kind -> longest edge in pixels, all variants are written as WebP
+IMAGE_VARIANTS = {
+    'processed': 1280,
+    'thumbnail': 320,
+}
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+VARIANT_QUALITY = 80
+
+# Longest edge of the blurred preview shown while an image loads, inlined as a data URI
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 50
+# EXIF orientations that rotate the image by 90 degrees
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+# Extensions the resize endpoint serves -> (Pillow format, content type)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+# Formats accepted for uploads as reported by Pillow, with the extension they're stored under
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'WEBP': 'webp',
+    'GIF': 'gif',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def open_image(file):
+    """Open an image lazily, Pillow only parses the header until pixels are needed.
+
+    Raises ValueError for anything that isn't an accepted format or has more
+    than IMAGE_MAX_PIXELS pixels, which also rules out decompression bombs
+    before a single pixel is decoded.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        try:
+            image = Image.open(file)
+        except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+            raise ValueError('The image has too many pixels.')
+        except (OSError, SyntaxError):
+            raise ValueError('The file is not an image or is corrupted.')
+    if image.format not in IMAGE_FORMATS:
+        image.close()
+        raise ValueError(f'{image.format} images are not supported.')
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        image.close()
+        raise ValueError('The image has too many pixels.')
+    return image
+
+
+def display_size(image):
+    """(width, height) of an opened image once its EXIF orientation is applied."""
+    width, height = image.size
+    # Read from the header for these, PNG keeps EXIF after the pixel data
+    if image.format in ('JPEG', 'WEBP') and image.getexif().get(0x0112) in ROTATED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def read_image_header(file):
+    """Validate an uploaded image from its header, returns (format, width, height) as displayed."""
+    file.seek(0)
+    with open_image(file) as image:
+        header = (image.format, *display_size(image))
+    file.seek(0)
+    return header
+
+
+def prepare_image(image, size, alpha=True):
+    """Decode an opened image for resizing to at most size pixels, upright and in RGB(A)."""
+    # Let JPEG decode at a reduced scale, nothing needs more than the requested size
+    image.draft('RGB', (size, size))
+    image = ImageOps.exif_transpose(image)
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    if has_alpha and not alpha:
+        # Formats without transparency get a white background instead of a black one
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def render_placeholder(image):
+    """A tiny WebP of a decoded image as a data URI, small enough to inline in payloads."""
+    image = image.copy()
+    image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def render_variants(source):
+    """Resize an image file into every variant.
+
+    Returns kind -> (content, width, height) and the summary kept in the
+    manifest: the displayed size of the original and its placeholder.
+    """
+    rendered = {}
+    # Direct uploads reach this without passing the upload validation, check again
+    with open_image(source) as image:
+        width, height = display_size(image)
+        image = prepare_image(image, max(IMAGE_VARIANTS.values()))
+        # Largest first, each smaller variant is resized from the previous one
+        for kind, size in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1]):
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+            rendered[kind] = (buffer.getvalue(), image.width, image.height)
+        summary = {'width': width, 'height': height, 'placeholder': render_placeholder(image)}
+    return rendered, summary
+
+
+def describe_image(source):
+    """The manifest summary of an image file alone, decoded at the smallest scale JPEG allows."""
+    with open_image(source) as image:
+        width, height = display_size(image)
+        placeholder = render_placeholder(prepare_image(image, PLACEHOLDER_SIZE))
+    return {'width': width, 'height': height, 'placeholder': placeholder}
+
+
+def render_derivative(source, width, extension):
+    """Resize an image file to at most width pixels wide, returns the encoded bytes."""
+    format = DERIVATIVE_FORMATS[extension][0]
+    with open_image(source) as image:
+        image = prepare_image(image, width, alpha=format != 'JPEG')
+        # Height is left unbounded, never upscales
+        image.thumbnail((width, image.height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format, quality=VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def build_variant_name(stem, kind, content):
+    # Content hash in the name, so variant URLs never change meaning and cache forever
+    digest = hashlib.sha1(content).hexdigest()[:12]
+    return f'{stem}-{kind}-{digest}.{VARIANT_EXTENSION}'
+
+
+def generate_variants(storage, name, stem):
+    """Write the variants of a stored image next to it, returns the manifest kept on the model.
+
+    Only goes through the storage API, so it works the same on the local
+    FileSystemStorage and on S3.
+    """
+    with storage.open(name, 'rb') as source:
+        rendered, summary = render_variants(source)
+    variants = {'source': name, **summary}
+    for kind, (content, width, height) in rendered.items():
+        key = build_variant_name(stem, kind, content)
+        # Shared originals produce the same variants, the name already says it's the same content
+        if not storage.exists(key):
+            key = storage.save(key, ContentFile(content))
+        variants[kind] = {'name': key, 'width': width, 'height': height}
+    return variants
+
+
+def get_variant_name(variants, kind):
+    entry = (variants or {}).get(kind)
+    return entry['name'] if entry else None
+
+
+def variant_url(storage, variants, kind):
+    name = get_variant_name(variants, kind)
+    return storage.url(name) if name else None
+
+
+def needs_variants(file, variants):
+    # The manifest records the original it was made from, a replaced file is processed again
+    return bool(file) and (variants or {}).get('source') != file.name
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned, not forked: workers must not share the parent's DB connections or threads
+            _executor = ProcessPoolExecutor(
+                max_workers=max(settings.IMAGE_PIPELINE_WORKERS, 1),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+    return _executor
+
+
+def run_job(model_label, field_name, name, stem):
+    # Runs in a worker process, only storage I/O and Pillow, no database access
+    model = apps.get_model(model_label)
+    storage = model._meta.get_field(field_name).storage
+    return generate_variants(storage, name, stem)
+
+
+def run_summary_job(model_label, field_name, name):
+    # Worker side of describe_image, for backfilling manifests made before summaries existed
+    storage = apps.get_model(model_label)._meta.get_field(field_name).storage
+    with storage.open(name, 'rb') as source:
+        return describe_image(source)
+
+
+def store_result(model, pk, variants):
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is not None:
+        instance.store_variants(variants)
+
+
+def _on_job_done(model, pk, future):
+    try:
+        variants = future.result()
+    except Exception:
+        logger.exception('Generating image variants failed for %s %s', model._meta.label, pk)
+        return
+    try:
+        store_result(model, pk, variants)
+    except Exception:
+        logger.exception('Storing image variants failed for %s %s', model._meta.label, pk)
+    finally:
+        # Called on the executor's thread, which otherwise keeps its connection open
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def submit(instance, field_name, stem):
+    """Generate variants for instance.<field_name>, the result goes to instance.store_variants()."""
+    model = type(instance)
+    args = (model._meta.label, field_name, getattr(instance, field_name).name, stem)
+    if settings.IMAGE_PIPELINE_WORKERS <= 0:
+        # Inline, for development and scripts without a worker pool
+        try:
+            store_result(model, instance.pk, run_job(*args))
+        except Exception:
+            logger.exception('Image variants failed for %s %s', model._meta.label, instance.pk)
+        return
+    future = get_executor().submit(run_job, *args)
+    future.add_done_callback(lambda future: _on_job_done(model, instance.pk, future))
+    return future
+
+
+def schedule(instance, field_name, stem):
+    # After commit, so the worker never races the upload's own transaction
+    transaction.on_commit(lambda: submit(instance, field_name, stem))
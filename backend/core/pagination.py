@@ -0,0 +1,137 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks past the last row instead of using OFFSET.
+
+    The ordering is read from the queryset (plain field or annotation names,
+    optionally prefixed with '-') and the primary key is appended as a
+    tiebreaker, so every row has a unique position. Cursors are opaque
+    base64 tokens holding the ordering and the sort values of the last row
+    on the page. No COUNT query is run; one extra row is fetched to find out
+    whether there is a next page.
+    """
+    page_size = 9
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = self.decode_cursor(cursor)
+            try:
+                # The model fields validate the cursor values while the filter is built
+                queryset = queryset.filter(self.build_seek_filter(values))
+            except (ValidationError, ValueError, TypeError, decimal.InvalidOperation):
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        for key in ordering:
+            if not isinstance(key, str):
+                raise ImproperlyConfigured(
+                    f'{self.__class__.__name__} only supports orderings by field name, got {key!r}'
+                )
+        pk_name = queryset.model._meta.pk.name
+        if not {pk_name, f'-{pk_name}', 'pk', '-pk'} & set(ordering):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append(f'-{pk_name}' if descending else pk_name)
+        return ordering
+
+    def build_seek_filter(self, values):
+        # (a, b, id) > (va, vb, vid) expanded into
+        # a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND id > vid)
+        seek = Q()
+        equal = Q()
+        for key, value in zip(self.ordering, values):
+            name = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            seek |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        # Redundant bound on the leading key so an index range scan can be used
+        first = self.ordering[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+        return seek & Q(**{f'{first.lstrip("-")}__{bound}': values[0]})
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        # Rows are model instances, or dicts when a values() queryset is paginated
+        if isinstance(last, dict):
+            values = [last[key.lstrip('-')] for key in self.ordering]
+        else:
+            values = [getattr(last, key.lstrip('-')) for key in self.ordering]
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values))
+
+    def encode_cursor(self, values):
+        payload = {'o': self.ordering, 'v': [self._dump_value(value) for value in values]}
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            ordering, values = payload['o'], payload['v']
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor is only valid for the ordering it was issued for
+        if ordering != self.ordering or not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _dump_value(value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
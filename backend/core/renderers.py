@@ -0,0 +1,25 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson.
+
+    Gives the same bytes as JSONRenderer for compact, non-ASCII-escaped
+    output of dicts, lists, strings, integers, booleans and None, which is
+    everything the fast read paths emit (floats are not used there, their
+    exponent formatting differs). Indented output and values orjson can't
+    encode, such as Decimals, go through JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same strict javascript subset escaping as JSONRenderer
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,92 @@
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from .images import read_image_header
+from .uploads import UPLOAD_CONTENT_TYPES
+
+
+class AbsoluteURLField(serializers.ReadOnlyField):
+    """A storage URL made absolute against the request, the way FileField renders."""
+    def to_representation(self, value):
+        request = self.context.get('request')
+        if value and request is not None:
+            return request.build_absolute_uri(value)
+        return value
+
+
+class ImageHeaderField(serializers.FileField):
+    """An ImageField that validates from the image header, the pixels are never decoded."""
+    default_error_messages = {
+        'invalid_image': 'Upload a valid image. {error}',
+        'too_large': 'The file is larger than {max_size} bytes.',
+    }
+
+    def to_internal_value(self, data):
+        # Checked first, oversized uploads arrive empty
+        if getattr(data, 'too_large', False):
+            self.fail('too_large', max_size=settings.UPLOAD_MAX_FILE_SIZE)
+        file = super().to_internal_value(data)
+        try:
+            read_image_header(file)
+        except ValueError as exc:
+            self.fail('invalid_image', error=exc)
+        return file
+
+
+class UploadRequestSerializer(serializers.Serializer):
+    # A file the client is about to upload directly to storage
+    content_type = serializers.ChoiceField(choices=list(UPLOAD_CONTENT_TYPES))
+    size = serializers.IntegerField(min_value=1, max_value=settings.DIRECT_UPLOAD_MAX_SIZE)
+
+
+class SparseFieldsMixin:
+    """Let clients shape read payloads with ?fields= and ?expand=.
+
+    `fields` is a comma separated list of fields to keep, dotted names reach
+    into nested serializers (fields=id,price,post.caption keeps only the
+    caption of a nested post). Heavy nested fields can declare a lighter
+    replacement in `compact_fields`; it is used whenever the view renders
+    the compact representation (context['compact']) unless the client asks
+    for the full field with expand=<path>.
+    """
+    # field name -> callable returning the compact replacement field
+    compact_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+
+        path = self.get_field_path()
+        expanded = self.get_requested_names(request, 'expand', path)
+        if self.context.get('compact'):
+            for name, build_field in self.compact_fields.items():
+                if name in fields and name not in expanded:
+                    fields[name] = build_field()
+
+        requested = self.get_requested_names(request, 'fields', path)
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
+    def get_field_path(self):
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(names))
+
+    @staticmethod
+    def get_requested_names(request, param, path):
+        # Names one level below `path`: fields=post.user.username gives 'post' at the
+        # root, 'user' at 'post' and 'username' at 'post.user'
+        prefix = f'{path}.' if path else ''
+        names = set()
+        for entry in request.query_params.get(param, '').split(','):
+            entry = entry.strip()
+            if entry.startswith(prefix) and len(entry) > len(prefix):
+                names.add(entry[len(prefix):].split('.')[0])
+        return names
@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +46,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Third party apps
     "rest_framework",
     "corsheaders",
@@ -102,6 +105,66 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory is per process, point DJANGO_CACHE_BACKEND at the file based
+# cache to share cached responses between workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "ecom-app"),
+    }
+}
+
+# Seconds a cached post list/detail response is kept, invalidation is signal driven
+POSTS_CACHE_TIMEOUT = int(os.environ.get("POSTS_CACHE_TIMEOUT", "300"))
+
+
+# Render the default list payloads from value rows instead of serializers
+FAST_READ_PATH = os.environ.get("FAST_READ_PATH", "1") == "1"
+
+# Worker processes that resize uploaded images, 0 runs the pipeline inline after commit
+IMAGE_PIPELINE_WORKERS = int(os.environ.get("IMAGE_PIPELINE_WORKERS", "2"))
+
+# Concurrent storage writes for the files of a single request
+UPLOAD_MAX_WORKERS = int(os.environ.get("UPLOAD_MAX_WORKERS", "4"))
+
+# Uploads stream to temp files, never into memory, and are validated from the image header
+FILE_UPLOAD_HANDLERS = ["core.upload_handlers.StreamingUploadHandler"]
+UPLOAD_MAX_FILE_SIZE = int(os.environ.get("UPLOAD_MAX_FILE_SIZE", str(10 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", str(40_000_000)))
+
+# Presigned direct uploads: largest accepted file, how long a target is valid,
+# and how long after issuing an upload can still be confirmed
+DIRECT_UPLOAD_MAX_SIZE = int(os.environ.get("DIRECT_UPLOAD_MAX_SIZE", str(UPLOAD_MAX_FILE_SIZE)))
+DIRECT_UPLOAD_EXPIRES = int(os.environ.get("DIRECT_UPLOAD_EXPIRES", "900"))
+DIRECT_UPLOAD_CONFIRM_MAX_AGE = int(os.environ.get("DIRECT_UPLOAD_CONFIRM_MAX_AGE", "86400"))
+
+# Resized post images served on demand: the widths clients may ask for, and the
+# local directory derivatives are cached in, least recently used go past the size
+IMAGE_RESIZE_WIDTHS = (160, 320, 640, 960, 1280, 1920)
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ecom-image-cache"))
+IMAGE_CACHE_MAX_SIZE = int(os.environ.get("IMAGE_CACHE_MAX_SIZE", str(512 * 1024 * 1024)))
+
+# Seconds the response to a request with an Idempotency-Key is replayed for retries
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", str(24 * 60 * 60)))
+
+# Where dispatch_order_events delivers order lifecycle events, comma separated sink
+# classes (orders.events.LogSink, FileSink or QueueSink, orders.rollups.SalesRollupSink
+# for the sales reports), and FileSink's file
+ORDER_EVENT_SINKS = [
+    path for path in os.environ.get(
+        "ORDER_EVENT_SINKS", "orders.events.LogSink,orders.rollups.SalesRollupSink"
+    ).split(",") if path
+]
+ORDER_EVENT_FILE = os.environ.get("ORDER_EVENT_FILE", os.path.join(BASE_DIR, "order-events.jsonl"))
+# Failed deliveries after which an order event failing on its own is parked, out of the outbox
+ORDER_EVENT_MAX_ATTEMPTS = int(os.environ.get("ORDER_EVENT_MAX_ATTEMPTS", "5"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -167,6 +230,7 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",  # Vite default port
     "http://localhost:5174",  # Alternative port
 ]
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:5173",
     "http://localhost:5174",
@@ -227,5 +291,9 @@ LOGGING = {
             'handlers': ['console'],
             'level': 'INFO',
         },
+        'orders.events': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
     },
 }
@@ -1,17 +1,120 @@
 from django.conf import settings
+from django.core import signing
 from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+from datetime import datetime, timezone
+import hashlib
 import os
 
+LOCAL_UPLOAD_SALT = 'core.storage_backends.local-upload'
+
+class DirectUploadMixin:
+    # Presigned POST, the browser sends the file straight to the bucket
+    def presigned_upload(self, name, content_type, max_size):
+        target = self.bucket.meta.client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=self._normalize_name(clean_name(name)),
+            Fields={'Content-Type': content_type},
+            Conditions=[{'Content-Type': content_type}, ['content-length-range', 1, max_size]],
+            ExpiresIn=settings.DIRECT_UPLOAD_EXPIRES,
+        )
+        return {'method': 'POST', 'url': target['url'], 'fields': target['fields']}
+
+class S3ListingMixin:
+    # Bulk listing and deletion for maintenance jobs such as gc_media
+    delete_batch_size = 1000
+
+    def iter_files(self):
+        """Yield (name, modified, size) for every stored file in name order, a page at a time."""
+        prefix = f'{self.location}/' if self.location else ''
+        paginator = self.connection.meta.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for item in page.get('Contents', ()):
+                yield item['Key'][len(prefix):], item['LastModified'], item['Size']
+
+    def delete_many(self, names):
+        """Delete up to 1000 keys per request, returns the names that could not be deleted."""
+        failed = []
+        client = self.connection.meta.client
+        for start in range(0, len(names), self.delete_batch_size):
+            keys = {self._normalize_name(clean_name(name)): name for name in names[start:start + self.delete_batch_size]}
+            response = client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+            )
+            failed.extend(keys[error['Key']] for error in response.get('Errors', ()))
+        return failed
+
+class LocalUploadStorage(FileSystemStorage):
+    # Local stand-in for presigned uploads, a signed URL on our own API accepts the PUT
+    def presigned_upload(self, name, content_type, max_size):
+        location = os.path.relpath(self.location, settings.MEDIA_ROOT)
+        token = signing.dumps(
+            {'l': location, 'n': name, 't': content_type, 'm': max_size}, salt=LOCAL_UPLOAD_SALT
+        )
+        return {
+            'method': 'PUT',
+            'url': reverse('direct-upload', args=[token]),
+            'headers': {'Content-Type': content_type},
+        }
+
+    def iter_files(self, directory=''):
+        """Yield (name, modified, size) for every stored file in name order, like an S3 listing."""
+        try:
+            entries = list(os.scandir(self.path(directory)))
+        except FileNotFoundError:
+            return
+        # A directory sorts as 'name/', so its files come out in the order of their full names
+        entries.sort(key=lambda entry: entry.name + '/' if entry.is_dir() else entry.name)
+        for entry in entries:
+            name = f'{directory}/{entry.name}' if directory else entry.name
+            if entry.is_dir():
+                yield from self.iter_files(name)
+            else:
+                stat = entry.stat()
+                yield name, datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc), stat.st_size
+
+    def delete_many(self, names):
+        failed = []
+        for name in names:
+            try:
+                self.delete(name)
+            except OSError:
+                failed.append(name)
+        return failed
+
+class ContentAddressedStore:
+    """Keys files by the SHA-256 of their content, on top of one of the storages here.
+
+    Identical bytes always map to the same key, so callers can look a digest
+    up and skip storing content that is already there.
+    """
+    def __init__(self, storage, prefix='sha256'):
+        self.storage = storage
+        self.prefix = prefix
+
+    @staticmethod
+    def digest(file):
+        sha256 = hashlib.sha256()
+        for chunk in file.chunks():
+            sha256.update(chunk)
+        file.seek(0)
+        return sha256.hexdigest()
+
+    def key(self, digest, extension):
+        return f'{self.prefix}/{digest[:2]}/{digest}.{extension}'
+
 class MediaStorage(S3Boto3Storage):
     location = ''
     file_overwrite = False
 
-class ProfileStorage(S3Boto3Storage):
+class ProfileStorage(DirectUploadMixin, S3ListingMixin, S3Boto3Storage):
     location = 'profiles'
     file_overwrite = True
 
-class PostStorage(S3Boto3Storage):
+class PostStorage(DirectUploadMixin, S3ListingMixin, S3Boto3Storage):
     location = 'posts'
     file_overwrite = False
 
@@ -20,7 +123,7 @@ def get_profile_storage():
         # For local development, use FileSystemStorage with profiles subdirectory
         storage_path = os.path.join(settings.MEDIA_ROOT, 'profiles')
         os.makedirs(storage_path, exist_ok=True)
-        return FileSystemStorage(
+        return LocalUploadStorage(
             location=storage_path,
             base_url=f"{settings.MEDIA_URL}profiles/"
         )
@@ -31,7 +134,7 @@ def get_post_storage():
         # For local development, use FileSystemStorage with posts subdirectory
         storage_path = os.path.join(settings.MEDIA_ROOT, 'posts')
         os.makedirs(storage_path, exist_ok=True)
-        return FileSystemStorage(
+        return LocalUploadStorage(
             location=storage_path,
             base_url=f"{settings.MEDIA_URL}posts/"
         )
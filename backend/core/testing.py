@@ -0,0 +1,26 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Rendered from the database every time, the response cache would hide N+1s
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class QueryBudgetMixin:
+    """Query-budget assertions for read endpoints, for TestCases with an authenticated self.client.
+
+    Each endpoint is requested with little related data, grown, and requested
+    again: the number of queries must not grow with the data (an N+1) and
+    must stay within the endpoint's budget.
+    """
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, f'{url}: HTTP {response.status_code}')
+        return len(context.captured_queries)
+
+    def assertQueryBudget(self, url, budget, grow):
+        small = self.count_queries(url)
+        grow()
+        large = self.count_queries(url)
+        self.assertEqual(small, large, f'{url}: {small} queries for little data, {large} for more')
+        self.assertLessEqual(large, budget, f'{url}: {large} queries, budget {budget}')
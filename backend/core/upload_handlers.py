@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class StreamingUploadHandler(TemporaryFileUploadHandler):
+    """Write every uploaded file to a temp file as it streams in.
+
+    Unlike the default handler pair nothing is kept in memory, whatever the
+    file size. Bytes past UPLOAD_MAX_FILE_SIZE are dropped and the file is
+    handed on empty and flagged too_large, so an oversized upload costs
+    neither memory nor disk. No field ever sees a truncated file: Django's
+    and DRF's file fields reject it as empty, ImageHeaderField as too large.
+    """
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.UPLOAD_MAX_FILE_SIZE:
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        too_large = self.received > settings.UPLOAD_MAX_FILE_SIZE
+        if too_large:
+            self.file.seek(0)
+            self.file.truncate()
+        file = super().file_complete(0 if too_large else file_size)
+        file.too_large = too_large
+        return file
@@ -0,0 +1,98 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core import signing
+from rest_framework.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Content types accepted for direct uploads, with the extension of the stored key
+UPLOAD_CONTENT_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+}
+UPLOAD_SALT = 'core.uploads.direct-upload'
+
+
+def save_files(storage, names, files, max_length=None):
+    """Store files under the given names concurrently, returns the names storage picked.
+
+    Bypasses FieldFile.save so the rows can be inserted in bulk afterwards.
+    If any upload fails, the ones that went through are deleted again before
+    the error is raised.
+    """
+    def save(name, file):
+        return storage.save(name, file, max_length=max_length)
+
+    if len(files) <= 1:
+        return [save(name, file) for name, file in zip(names, files)]
+
+    # Bounded per request, S3 clients are thread local in django-storages
+    with ThreadPoolExecutor(max_workers=min(settings.UPLOAD_MAX_WORKERS, len(files))) as executor:
+        futures = [executor.submit(save, name, file) for name, file in zip(names, files)]
+        wait(futures)
+    failed = [future for future in futures if future.exception() is not None]
+    if failed:
+        delete_files(storage, [future.result() for future in futures if future.exception() is None])
+        raise failed[0].exception()
+    return [future.result() for future in futures]
+
+
+def delete_files(storage, names):
+    # Best effort cleanup, a file that can't be deleted is left as an orphan
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception('Could not delete %s', name)
+
+
+def files_exist(storage, names):
+    """Check a batch of stored names at once, one HEAD request each on S3."""
+    if len(names) <= 1:
+        return [storage.exists(name) for name in names]
+    with ThreadPoolExecutor(max_workers=min(settings.UPLOAD_MAX_WORKERS, len(names))) as executor:
+        return list(executor.map(storage.exists, names))
+
+
+def unique_upload_name(prefix, content_type):
+    return f'{prefix}-{uuid.uuid4().hex}.{UPLOAD_CONTENT_TYPES[content_type]}'
+
+
+def issue_upload(request, storage, name, content_type, purpose):
+    """Phase one of a direct upload: a storage target plus the id to confirm it with.
+
+    The upload id is signed and bound to the user and purpose, so a confirm
+    call can only attach keys that were issued to the same user for the
+    same kind of file.
+    """
+    target = storage.presigned_upload(name, content_type, settings.DIRECT_UPLOAD_MAX_SIZE)
+    # Local targets are paths on this API
+    target['url'] = request.build_absolute_uri(target['url'])
+    upload_id = signing.dumps({'u': request.user.pk, 'p': purpose, 'n': name}, salt=UPLOAD_SALT)
+    return {'upload_id': upload_id, 'key': name, **target}
+
+
+def read_upload(upload_id, user, purpose):
+    """Phase two: the stored name behind an upload id, if it was issued to this user."""
+    try:
+        payload = signing.loads(upload_id, salt=UPLOAD_SALT, max_age=settings.DIRECT_UPLOAD_CONFIRM_MAX_AGE)
+    except signing.BadSignature:
+        raise ValidationError('Invalid or expired upload id')
+    if payload['u'] != user.pk or payload['p'] != purpose:
+        raise ValidationError('Invalid or expired upload id')
+    return payload['n']
+
+
+def read_uploads(upload_ids, user, purpose, storage):
+    names = [read_upload(upload_id, user, purpose) for upload_id in upload_ids]
+    if len(set(names)) != len(names):
+        raise ValidationError('Duplicate upload ids')
+    missing = [name for name, exists in zip(names, files_exist(storage, names)) if not exists]
+    if missing:
+        raise ValidationError({'missing': missing})
+    return names
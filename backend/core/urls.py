@@ -19,7 +19,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import test_env
+from .views import DirectUploadView, test_env
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,6 +27,7 @@ urlpatterns = [
     path('api/posts/', include('posts.urls')),
     path('api/orders/', include('orders.urls')),
     path('api/test-env/', test_env, name='test-env'),
+    path('api/uploads/<str:token>/', DirectUploadView.as_view(), name='direct-upload'),
 ]
 
 if settings.DEBUG:
@@ -1,7 +1,16 @@
+import os
+import tempfile
 from django.http import JsonResponse
 from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAdminUser
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .storage_backends import LOCAL_UPLOAD_SALT
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
@@ -18,4 +27,37 @@ def test_env(request):
         'DATABASE_HOST': settings.DATABASES['default']['HOST'],
         'DATABASE_PORT': settings.DATABASES['default']['PORT'],
     }
-    return JsonResponse(env_vars) 
\ No newline at end of file
+    return JsonResponse(env_vars)
+
+class DirectUploadView(APIView):
+    """Accepts the PUT of a LocalUploadStorage target, standing in for a presigned S3 URL."""
+    # The signed token is the authorization, like the signature of a presigned URL
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def put(self, request, token):
+        try:
+            payload = signing.loads(token, salt=LOCAL_UPLOAD_SALT, max_age=settings.DIRECT_UPLOAD_EXPIRES)
+        except signing.BadSignature:
+            return Response({'error': 'Invalid or expired upload URL'}, status=status.HTTP_403_FORBIDDEN)
+        if request.content_type.split(';')[0].strip() != payload['t']:
+            return Response({'error': 'Content-Type does not match the upload'}, status=status.HTTP_400_BAD_REQUEST)
+
+        storage = FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, payload['l']))
+        if storage.exists(payload['n']):
+            return Response({'error': 'Already uploaded'}, status=status.HTTP_409_CONFLICT)
+
+        # Streamed to disk, the body never has to fit in memory
+        with tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE) as buffer:
+            size = 0
+            stream = request.stream
+            while stream is not None and (chunk := stream.read(64 * 1024)):
+                size += len(chunk)
+                if size > payload['m']:
+                    return Response({'error': 'File too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+                buffer.write(chunk)
+            if not size:
+                return Response({'error': 'Empty upload'}, status=status.HTTP_400_BAD_REQUEST)
+            buffer.seek(0)
+            storage.save(payload['n'], File(buffer))
+        return Response(status=status.HTTP_204_NO_CONTENT)
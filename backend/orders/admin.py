@@ -1,17 +1,73 @@
-from django.contrib import admin
-from .models import Order, OrderItem, Cart, CartItem
+from django.contrib import admin, messages
+from .models import (
+    Order, OrderItem, OrderEvent, Cart, CartItem, IdempotencyKey, InvalidTransition,
+    DailySales, PostSales, SellerSales
+)
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    readonly_fields = ('post', 'quantity', 'price', 'created_at')
+    readonly_fields = ('post', 'seller', 'quantity', 'price', 'created_at')
 
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'status', 'payment_method', 'total_amount', 'created_at')
     list_filter = ('status', 'payment_method', 'created_at')
     search_fields = ('user__username', 'shipping_address')
-    readonly_fields = ('created_at', 'updated_at')
+    # Status only changes through transitions, so every change gets its outbox event
+    readonly_fields = ('status', 'created_at', 'updated_at')
     inlines = [OrderItemInline]
+    actions = ('mark_processing', 'mark_completed', 'mark_cancelled')
+
+    def transition(self, request, queryset, status):
+        moved = 0
+        for order in queryset:
+            try:
+                order.transition(status)
+                moved += 1
+            except InvalidTransition as exc:
+                self.message_user(request, f'Order {order.id}: {exc}', messages.WARNING)
+        self.message_user(request, f'{moved} orders marked {status}')
+
+    @admin.action(description='Mark selected orders processing')
+    def mark_processing(self, request, queryset):
+        self.transition(request, queryset, 'processing')
+
+    @admin.action(description='Mark selected orders completed')
+    def mark_completed(self, request, queryset):
+        self.transition(request, queryset, 'completed')
+
+    @admin.action(description='Cancel selected orders')
+    def mark_cancelled(self, request, queryset):
+        self.transition(request, queryset, 'cancelled')
+
+class OrderEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'order', 'created_at', 'dispatched_at', 'attempts', 'parked_at')
+    list_filter = ('event_type', 'dispatched_at', 'parked_at')
+    readonly_fields = (
+        'order', 'event_type', 'payload', 'created_at', 'dispatched_at', 'attempts', 'last_error', 'parked_at'
+    )
+    actions = ('retry',)
+
+    @admin.action(description='Retry selected parked events')
+    def retry(self, request, queryset):
+        retried = queryset.parked().update(parked_at=None, attempts=0)
+        self.message_user(request, f'{retried} events back in the outbox')
+
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ('date', 'order_count', 'revenue')
+    date_hierarchy = 'date'
+    # Kept by the rollup sink and rebuild_sales_rollups
+    readonly_fields = ('date', 'order_count', 'revenue')
+
+class PostSalesAdmin(admin.ModelAdmin):
+    list_display = ('post', 'seller', 'units_sold', 'revenue')
+    search_fields = ('post__caption', 'seller__username')
+    readonly_fields = ('post', 'seller', 'units_sold', 'revenue')
+
+class SellerSalesAdmin(admin.ModelAdmin):
+    list_display = ('seller', 'units_sold', 'revenue')
+    search_fields = ('seller__username',)
+    readonly_fields = ('seller', 'units_sold', 'revenue')
 
 class CartItemInline(admin.TabularInline):
     model = CartItem
@@ -23,6 +79,16 @@ class CartAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     inlines = [CartItemInline]
 
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'status_code', 'created_at', 'expires_at')
+    search_fields = ('key', 'user__username')
+    readonly_fields = ('user', 'key', 'fingerprint', 'status_code', 'content_type', 'created_at', 'expires_at')
+
 admin.site.register(Order, OrderAdmin)
 admin.site.register(Cart, CartAdmin)
 admin.site.register(CartItem)
+admin.site.register(IdempotencyKey, IdempotencyKeyAdmin)
+admin.site.register(OrderEvent, OrderEventAdmin)
+admin.site.register(DailySales, DailySalesAdmin)
+admin.site.register(PostSales, PostSalesAdmin)
+admin.site.register(SellerSales, SellerSalesAdmin)
@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import queue
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import OrderEvent
+
+logger = logging.getLogger(__name__)
+
+
+class LogSink:
+    """Write every event to the orders.events logger."""
+    def send(self, messages):
+        for message in messages:
+            logger.info('%s order=%s event=%s', message['type'], message['order_id'], message['id'])
+
+
+class FileSink:
+    """Append events as JSON lines to ORDER_EVENT_FILE, synced to disk before the batch counts as delivered."""
+    def __init__(self, path=None):
+        self.path = path or settings.ORDER_EVENT_FILE
+
+    def send(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.writelines(json.dumps(message, separators=(',', ':')) + '\n' for message in messages)
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class QueueSink:
+    """Put events on an in-process queue, shared by every instance, for tests and benchmarks."""
+    queue = queue.Queue()
+
+    def send(self, messages):
+        for message in messages:
+            self.queue.put(message)
+
+
+def get_sinks():
+    return [import_string(path)() for path in settings.ORDER_EVENT_SINKS]
+
+
+def send(sinks, events):
+    messages = [event.as_message() for event in events]
+    # Database writes of the sinks commit with the batch, or not at all
+    with transaction.atomic():
+        for sink in sinks:
+            sink.send(messages)
+
+
+def isolate_failures(sinks, events):
+    """Halve a failed batch until the events failing on their own are found.
+
+    Returns the events delivered meanwhile, the ones still failing and the
+    last error. Once both halves fail it is the sinks failing rather than
+    one event, and the halving stops there.
+    """
+    delivered = []
+    error = None
+    while len(events) > 1:
+        half = len(events) // 2
+        failed = []
+        for part in (events[:half], events[half:]):
+            try:
+                send(sinks, part)
+            except Exception as exc:
+                failed.append(part)
+                error = exc
+            else:
+                delivered += part
+        events = [event for part in failed for event in part]
+        if len(failed) != 1:
+            break
+    return delivered, events, error
+
+
+def dispatch_batch(sinks, batch_size):
+    """Deliver the oldest pending events to every sink, returns how many were delivered.
+
+    The batch is locked with SKIP LOCKED, so dispatchers running side by
+    side each take different events. If a sink fails the batch is halved to
+    deliver the events around the failing ones, which stay pending and are
+    retried. An event with ORDER_EVENT_MAX_ATTEMPTS failed attempts is parked
+    once it fails while the rest of its batch goes through, so it can't hold
+    up the outbox. Delivery is at least once and consumers deduplicate on the
+    event id. Sinks writing to the database, like
+    orders.rollups.SalesRollupSink, apply each event exactly once.
+    """
+    with transaction.atomic():
+        events = list(
+            OrderEvent.objects.pending().select_for_update(skip_locked=True).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+        try:
+            send(sinks, events)
+        except Exception as exc:
+            delivered, failed, error = isolate_failures(sinks, events)
+            error = error or exc
+        else:
+            delivered, failed, error = events, [], None
+
+        now = timezone.now()
+        if delivered:
+            OrderEvent.objects.filter(pk__in=[event.id for event in delivered]).update(
+                dispatched_at=now, attempts=F('attempts') + 1
+            )
+        if failed:
+            # Recorded and committed before the error is raised
+            OrderEvent.objects.filter(pk__in=[event.id for event in failed]).update(
+                attempts=F('attempts') + 1, last_error=repr(error)
+            )
+        if len(failed) == 1 and delivered and failed[0].attempts + 1 >= settings.ORDER_EVENT_MAX_ATTEMPTS:
+            OrderEvent.objects.filter(pk=failed[0].id).update(parked_at=now)
+            logger.error('Parked order event %s after %s attempts: %r', failed[0].id, failed[0].attempts + 1, error)
+    if not delivered:
+        raise error
+    if failed:
+        logger.warning('Order events %s failed: %r', [event.id for event in failed], error)
+    return len(delivered)
@@ -0,0 +1,36 @@
+from core.fastpath import decimal_formatter, file_url_builder, format_datetime
+from posts.models import PostImage
+from .models import Order
+
+# Columns of Order.objects.with_summary() an order history row is rendered from
+ORDER_SUMMARY_VALUES = (
+    'id', 'status', 'payment_method', 'total_amount', 'item_count', 'total_quantity',
+    'thumbnail', 'created_at', 'updated_at',
+)
+
+
+class OrderSummaryRenderer:
+    """Build OrderSummarySerializer output straight from value rows.
+
+    Keys and formatting follow OrderSummarySerializer exactly, so the
+    rendered JSON is byte for byte the same.
+    """
+    def __init__(self, request):
+        self.format_total = decimal_formatter(Order._meta.get_field('total_amount'))
+        self.image_url = file_url_builder(PostImage._meta.get_field('image').storage, request)
+
+    def render(self, rows):
+        return [
+            {
+                'id': row['id'],
+                'status': row['status'],
+                'payment_method': row['payment_method'],
+                'total_amount': self.format_total(row['total_amount']),
+                'item_count': row['item_count'],
+                'total_quantity': row['total_quantity'],
+                'thumbnail_url': self.image_url(row['thumbnail']),
+                'created_at': format_datetime(row['created_at']),
+                'updated_at': format_datetime(row['updated_at']),
+            }
+            for row in rows
+        ]
@@ -0,0 +1,74 @@
+import hashlib
+from functools import wraps
+
+from django.db import transaction
+from django.http import HttpResponse
+from django.http.request import RawPostDataException
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def request_fingerprint(request):
+    try:
+        body = request.body
+    except RawPostDataException:
+        # Multipart bodies are streamed straight to the parsers, hash the parsed fields instead
+        body = repr(sorted(request.data.lists())).encode()
+    digest = hashlib.sha256()
+    for part in (request.method.encode(), request.get_full_path().encode(), body):
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def idempotent(handler):
+    """Make a view handler replay its response for retries sent with the same Idempotency-Key.
+
+    The handler runs in a transaction holding the key's row lock, so a
+    duplicate sent while the first is still running waits and gets the same
+    response. Requests without the header run as usual. Errors raised by the
+    handler and 5xx responses roll back with the key, the retry runs again.
+    """
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return handler(view, request, *args, **kwargs)
+        if not 0 < len(key) <= MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Read before the handler parses the body, Django keeps it for the parsers
+        fingerprint = request_fingerprint(request)
+
+        with transaction.atomic():
+            record = IdempotencyKey.objects.claim(request.user, key)
+            if record.is_stored:
+                if record.fingerprint != fingerprint:
+                    return Response(
+                        {'error': f'{HEADER} was already used for a different request'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                return HttpResponse(
+                    bytes(record.content),
+                    status=record.status_code,
+                    content_type=record.content_type or None,
+                    headers={'Idempotent-Replayed': 'true'},
+                )
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+            # Rendered here, so replays get exactly the bytes this request got
+            response = view.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            record.store(fingerprint, response)
+            return response
+
+    return wrapper
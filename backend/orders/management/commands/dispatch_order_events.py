@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from orders.events import dispatch_batch, get_sinks
+
+
+class Command(BaseCommand):
+    help = 'Deliver order lifecycle events from the outbox to the ORDER_EVENT_SINKS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Events locked and delivered per transaction')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox is drained')
+
+    def handle(self, *args, **options):
+        sinks = get_sinks()
+        delivered = 0
+        failures = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    count = dispatch_batch(sinks, options['batch_size'])
+                    failures = 0
+                except Exception as exc:
+                    # The batch stays in the outbox, back off and retry it
+                    failures += 1
+                    self.stderr.write(f'Dispatching order events failed: {exc!r}')
+                    close_old_connections()
+                    time.sleep(min(options['poll_interval'] * 2 ** failures, 60))
+                    continue
+                delivered += count
+                if count < options['batch_size']:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Delivered {delivered} order events in {elapsed:.1f}s ({delivered / elapsed if elapsed else 0:.0f} events/s)'
+        ))
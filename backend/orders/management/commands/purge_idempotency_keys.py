@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from orders.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete stored idempotency key responses past their expiry'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per DELETE')
+
+    def handle(self, *args, **options):
+        deleted = 0
+        # Short batches, so a large backlog never holds many row locks at once
+        while True:
+            batch = list(IdempotencyKey.objects.expired().values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            deleted += IdempotencyKey.objects.expired().filter(pk__in=batch).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
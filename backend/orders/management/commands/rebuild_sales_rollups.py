@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+from orders.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the sales rollups from the orders, to backfill them or repair drift'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = rebuild()
+        elapsed = time.perf_counter() - start
+        rows = ', '.join(f'{count} {model._meta.verbose_name_plural}' for model, count in written.items())
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the sales rollups in {elapsed:.1f}s: {rows}'))
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='orderevent',
+            name='order_event_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='orderevent',
+            name='parked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='orderevent',
+            index=models.Index(condition=models.Q(('dispatched_at__isnull', True), ('parked_at__isnull', True)), fields=['id'], name='order_event_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_orderevent_parked_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='seller',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE orders_orderitem AS i
+                SET seller_id = p.user_id
+                FROM posts_post AS p
+                WHERE p.id = i.post_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,5 +1,161 @@
-from django.db import models
+from decimal import Decimal
+from datetime import timedelta
+from django.db import connections, models, transaction
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Prefetch, Subquery, Sum
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
+from posts.models import PostImage
+
+def prefetch_items(item_model):
+    # Order and cart items render their post with its seller and images
+    return Prefetch(
+        'items',
+        queryset=item_model.objects.select_related('post__user').prefetch_related('post__images').order_by('id')
+    )
+
+def cart_totals(prefix=''):
+    """Line count, total quantity and total amount of cart items as aggregate expressions.
+
+    prefix is the path from the queried model to the items, e.g. 'items__' from Cart.
+    """
+    amount = DecimalField(max_digits=12, decimal_places=2)
+    return {
+        'item_count': Count(f'{prefix}id'),
+        'total_quantity': Coalesce(Sum(f'{prefix}quantity'), 0),
+        'total_amount': Coalesce(
+            Sum(F(f'{prefix}quantity') * F(f'{prefix}post__price'), output_field=amount),
+            Decimal('0'),
+            output_field=amount,
+        ),
+    }
+
+# Order status -> the statuses it may move to, cancelled and completed are final
+ORDER_TRANSITIONS = {
+    'pending': ('processing', 'cancelled'),
+    'processing': ('completed', 'cancelled'),
+    'completed': (),
+    'cancelled': (),
+}
+
+class InvalidTransition(Exception):
+    def __init__(self, current, status):
+        super().__init__(f'Cannot move an order from {current} to {status}')
+        self.current = current
+        self.status = status
+
+class OrderQuerySet(models.QuerySet):
+    def with_items(self):
+        return self.prefetch_related(prefetch_items(OrderItem))
+
+    def with_summary(self):
+        """Line count, total quantity and the thumbnail variant of the first item's cover image.
+
+        Correlated subqueries, so the items are never loaded and the orders
+        aren't grouped. thumbnail is a storage name, None until the image
+        pipeline has produced the variant.
+        """
+        lines = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        cover = (
+            PostImage.objects.filter(post__orderitem__order=OuterRef('pk'))
+            .order_by('post__orderitem__id', 'created_at', 'id')
+            .annotate(name=KT('variants__thumbnail__name'))
+            .values('name')
+        )
+        return self.annotate(
+            item_count=Coalesce(Subquery(lines.annotate(count=Count('id')).values('count')), 0),
+            total_quantity=Coalesce(
+                Subquery(lines.annotate(total=Sum('quantity')).values('total'), output_field=IntegerField()), 0
+            ),
+            thumbnail=Subquery(cover[:1], output_field=models.CharField()),
+        )
+
+class CartQuerySet(models.QuerySet):
+    def with_items(self):
+        return self.prefetch_related(prefetch_items(CartItem))
+
+    def with_totals(self):
+        # Computed with the cart row, no need to load the items for a total
+        return self.annotate(**cart_totals('items__'))
+
+    def add_item(self, user, post_id, quantity):
+        """Add quantity of a post to the user's cart in a single statement, returns the cart.
+
+        Creates the cart and the item as needed, an existing item gets the
+        quantity added in place, so concurrent adds never lose an increment.
+        Returns None without writing anything when the post doesn't exist.
+        """
+        cart_table = self.model._meta.db_table
+        item_table = CartItem._meta.db_table
+        post_table = CartItem._meta.get_field('post').related_model._meta.db_table
+        # Data modifying CTEs always run, both inserts select from post so a missing post writes nothing.
+        # Touching updated_at moves the cart's Last-Modified like the touch_cart signal does.
+        carts = self.raw(
+            f'WITH post AS (SELECT id FROM {post_table} WHERE id = %s), '
+            f'cart AS ('
+            f'INSERT INTO {cart_table} (user_id, created_at, updated_at) SELECT %s, now(), now() FROM post '
+            f'ON CONFLICT (user_id) DO UPDATE SET updated_at = EXCLUDED.updated_at '
+            f'RETURNING id, user_id, created_at, updated_at), '
+            f'item AS ('
+            f'INSERT INTO {item_table} (cart_id, post_id, quantity, added_at) '
+            f'SELECT cart.id, post.id, %s, now() FROM cart, post '
+            f'ON CONFLICT (cart_id, post_id) DO UPDATE SET quantity = {item_table}.quantity + EXCLUDED.quantity '
+            f'RETURNING cart_id) '
+            f'SELECT cart.* FROM cart, item',
+            [post_id, user.pk, quantity],
+            using=self.db,
+        )
+        cart = next(iter(carts), None)
+        if cart is not None:
+            cart.user = user
+        return cart
+
+    def apply_changes(self, user, changes):
+        """Apply {post_id: (quantity, absolute)} to the user's cart in a single statement, returns the cart.
+
+        Relative changes add to the item's quantity, absolute ones replace
+        it and 0 removes the item. Each post appears once, so no two parts
+        of the statement touch the same row. Posts that don't exist are
+        skipped and listed in cart.missing_posts, callers roll back on them.
+        """
+        cart_table = self.model._meta.db_table
+        item_table = CartItem._meta.db_table
+        post_table = CartItem._meta.get_field('post').related_model._meta.db_table
+        post_ids = list(changes)
+        quantities = [quantity for quantity, _ in changes.values()]
+        absolute = [is_absolute for _, is_absolute in changes.values()]
+
+        def upsert(condition, new_quantity):
+            return (
+                f'INSERT INTO {item_table} (cart_id, post_id, quantity, added_at) '
+                f'SELECT cart.id, post.id, change.quantity, now() '
+                f'FROM cart, change JOIN {post_table} AS post ON post.id = change.post_id WHERE {condition} '
+                f'ON CONFLICT (cart_id, post_id) DO UPDATE SET quantity = {new_quantity}'
+            )
+
+        carts = self.raw(
+            f'WITH cart AS ('
+            f'INSERT INTO {cart_table} (user_id, created_at, updated_at) VALUES (%s, now(), now()) '
+            f'ON CONFLICT (user_id) DO UPDATE SET updated_at = EXCLUDED.updated_at '
+            f'RETURNING id, user_id, created_at, updated_at), '
+            f'change AS (SELECT * FROM unnest(%s::bigint[], %s::integer[], %s::boolean[]) '
+            f'AS change (post_id, quantity, absolute)), '
+            f'removed AS (DELETE FROM {item_table} AS item USING cart, change '
+            f'WHERE item.cart_id = cart.id AND item.post_id = change.post_id '
+            f'AND change.absolute AND change.quantity = 0), '
+            f'added AS ({upsert("NOT change.absolute", f"{item_table}.quantity + EXCLUDED.quantity")}), '
+            f'replaced AS ({upsert("change.absolute AND change.quantity > 0", "EXCLUDED.quantity")}) '
+            f'SELECT cart.*, ARRAY('
+            f'SELECT post_id FROM change WHERE NOT (absolute AND quantity = 0) '
+            f'AND NOT EXISTS (SELECT 1 FROM {post_table} AS post WHERE post.id = change.post_id)'
+            f') AS missing_posts FROM cart',
+            [user.pk, post_ids, quantities, absolute],
+            using=self.db,
+        )
+        cart = next(iter(carts))
+        cart.user = user
+        return cart
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -25,15 +181,49 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Order history, keyset paginated on (created_at, id) per user
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_at_id_idx'),
+        ]
 
     def __str__(self):
         return f'Order {self.id} by {self.user.username}'
 
+    def transition(self, status, only_from=None):
+        """Move the order to status and write its OrderEvent in the same transaction.
+
+        The row is locked and its status read again first, so concurrent
+        transitions run one after the other and each is checked against the
+        status it really leaves. only_from narrows the statuses the caller
+        accepts leaving. Raises InvalidTransition.
+        """
+        with transaction.atomic():
+            current = Order.objects.select_for_update().values_list('status', flat=True).get(pk=self.pk)
+            if status not in ORDER_TRANSITIONS[current] or (only_from is not None and current not in only_from):
+                raise InvalidTransition(current, status)
+            self.status = status
+            self.save(update_fields=['status', 'updated_at'])
+            self.record_event(f'order.{status}', previous_status=current)
+
+    def record_event(self, event_type, previous_status=None):
+        # Called inside the transaction making the change, the event commits or rolls back with it
+        return OrderEvent.objects.create(order=self, event_type=event_type, payload={
+            'order_id': self.pk,
+            'user_id': self.user_id,
+            'status': self.status,
+            'previous_status': previous_status,
+            'total_amount': str(self.total_amount),
+        })
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     post = models.ForeignKey('posts.Post', on_delete=models.SET_NULL, null=True)
+    # The post's seller at checkout, still known after the post is deleted
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -41,22 +231,189 @@ class OrderItem(models.Model):
     def __str__(self):
         return f'Order Item {self.id} for Order {self.order.id}'
 
+class OrderEventQuerySet(models.QuerySet):
+    def pending(self):
+        return self.filter(dispatched_at__isnull=True, parked_at__isnull=True)
+
+    def parked(self):
+        return self.filter(dispatched_at__isnull=True, parked_at__isnull=False)
+
+class OrderEvent(models.Model):
+    """Outbox row for an order lifecycle change, delivered to the sinks by dispatch_order_events."""
+    # Kept when the order goes, the payload carries its id
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, related_name='events')
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    # Delivery attempts and the error of the last failed one
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Set once the event kept failing on its own, dispatchers skip it until it is retried from the admin
+    parked_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OrderEventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Dispatchers only ever scan the pending events, in id order
+            models.Index(
+                fields=['id'], condition=models.Q(dispatched_at__isnull=True, parked_at__isnull=True),
+                name='order_event_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} event {self.id}'
+
+    def as_message(self):
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'order_id': self.order_id,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat(),
+        }
+
+class DailySales(models.Model):
+    """Orders placed on a day and their revenue, less the ones cancelled since. Kept by orders.rollups."""
+    date = models.DateField(unique=True)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily sales'
+
+    def __str__(self):
+        return f'Sales on {self.date}'
+
+class PostSales(models.Model):
+    """Units sold and revenue of a post over all orders not cancelled. Kept by orders.rollups."""
+    post = models.OneToOneField('posts.Post', on_delete=models.CASCADE, related_name='sales')
+    # The post's seller, so a seller's report doesn't join the posts
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    units_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'post sales'
+        indexes = [
+            # Best sellers first, overall and per seller, keyset paginated
+            models.Index(fields=['revenue', 'id'], name='post_sales_revenue_idx'),
+            models.Index(fields=['seller', 'revenue', 'id'], name='post_sales_seller_revenue_idx'),
+        ]
+
+    def __str__(self):
+        return f'Sales of post {self.post_id}'
+
+class SellerSales(models.Model):
+    """Units sold and revenue of a seller's posts over all orders not cancelled. Kept by orders.rollups."""
+    seller = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sales')
+    units_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'seller sales'
+        indexes = [
+            models.Index(fields=['revenue', 'id'], name='seller_sales_revenue_idx'),
+        ]
+
+    def __str__(self):
+        return f'Sales of seller {self.seller_id}'
+
 class Cart(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
     def __str__(self):
         return f'Cart for {self.user.username}'
 
+class CartItemQuerySet(models.QuerySet):
+    def summary(self):
+        return self.aggregate(**cart_totals())
+
+    def remove_lines(self, cart_id, item_ids):
+        """Delete cart lines with one DELETE and touch their cart once.
+
+        QuerySet.delete() would load the rows to send post_delete for each,
+        and touch_cart would update the cart once per line.
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.model._meta.db_table} WHERE id = ANY(%s)', [list(item_ids)])
+        Cart.objects.using(self.db).filter(pk=cart_id).update(updated_at=timezone.now())
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     post = models.ForeignKey('posts.Post', on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         unique_together = ('cart', 'post')
 
     def __str__(self):
         return f'Cart Item {self.id} for {self.cart.user.username}'
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    def claim(self, user, key):
+        """Lock the user's record for key, inserting an empty one first if there is none.
+
+        A concurrent request with the same key blocks here until the first
+        one's transaction ends, then finds its stored response.
+        """
+        table = self.model._meta.db_table
+        # DO UPDATE instead of DO NOTHING so the existing row is locked and returned
+        records = self.raw(
+            f'INSERT INTO {table} (user_id, key, fingerprint, content, content_type, created_at, expires_at) '
+            f"VALUES (%s, %s, '', '', '', now(), now()) "
+            f'ON CONFLICT (user_id, key) DO UPDATE SET key = EXCLUDED.key '
+            f'RETURNING *',
+            [user.pk, key],
+            using=self.db,
+        )
+        return next(iter(records))
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+class IdempotencyKey(models.Model):
+    """Response of a request made with an Idempotency-Key header, replayed for retries until it expires."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    # Hash of the method, path and body the key was first used with
+    fingerprint = models.CharField(max_length=64)
+    # Empty until the request finished, an unfinished row is never committed
+    status_code = models.PositiveSmallIntegerField(null=True)
+    # Rendered body, replayed byte for byte
+    content = models.BinaryField(default=b'')
+    content_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f'Idempotency key {self.key} of user {self.user_id}'
+
+    @property
+    def is_stored(self):
+        return self.status_code is not None and self.expires_at > timezone.now()
+
+    def store(self, fingerprint, response):
+        self.fingerprint = fingerprint
+        self.status_code = response.status_code
+        self.content = response.content
+        self.content_type = response.get('Content-Type', '')
+        self.created_at = timezone.now()
+        self.expires_at = self.created_at + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        self.save(update_fields=[
+            'fingerprint', 'status_code', 'content', 'content_type', 'created_at', 'expires_at'
+        ])
@@ -0,0 +1,152 @@
+"""Sales rollups, kept up to date from the order outbox.
+
+SalesRollupSink adds each order.created event onto DailySales, PostSales and
+SellerSales and takes each order.cancelled event off them again. It runs
+inside the dispatch transaction, so an event is counted exactly when it is
+marked dispatched, and checkouts never wait on the rollup rows.
+rebuild() recomputes the same numbers from the orders whose events have been
+dispatched, plus the orders from before the outbox. Rows whose sales were all
+cancelled stay, at zero, until the next rebuild. Order lines keep their seller,
+so both count a deleted post's sales towards its seller, and only its own row
+goes with it.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+from django.db import connections, router, transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import DailySales, Order, OrderEvent, OrderItem, PostSales, SellerSales
+
+# Event type -> what it does to the rollups
+EVENT_SIGNS = {'order.created': 1, 'order.cancelled': -1}
+
+# pg_advisory_xact_lock key, shared by the sinks and taken exclusively by rebuild()
+ROLLUP_LOCK = 0x5a1e5
+
+
+def lock_rollups(shared):
+    with connections[router.db_for_write(DailySales)].cursor() as cursor:
+        cursor.execute(f"SELECT pg_advisory_xact_lock{'_shared' if shared else ''}(%s)", [ROLLUP_LOCK])
+
+
+def add_totals(model, key, totals, rows, attributes=()):
+    """Add rows of (key, *attributes, *totals) onto the model's rows with that key, in one upsert.
+
+    Missing rows are inserted, attributes are only written on insert. Rows go
+    in key order, so concurrent upserts lock the rows in the same order.
+    """
+    if not rows:
+        return
+    connection = connections[router.db_for_write(model)]
+    table = model._meta.db_table
+    fields = [model._meta.get_field(name) for name in (key, *attributes, *totals)]
+    columns = ', '.join(field.column for field in fields)
+    arrays = ', '.join(f'%s::{field.db_type(connection)}[]' for field in fields)
+    updates = ', '.join(f'{field.column} = {table}.{field.column} + EXCLUDED.{field.column}' for field in fields[-len(totals):])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) SELECT * FROM unnest({arrays}) '
+            f'ON CONFLICT ({fields[0].column}) DO UPDATE SET {updates}',
+            [list(column) for column in zip(*sorted(rows))],
+        )
+
+
+def apply_orders(signs):
+    """Add (sign 1) or take off (sign -1) the sales of the orders in {order id: sign}."""
+    signs = {order_id: sign for order_id, sign in signs.items() if sign}
+    if not signs:
+        return
+    days = defaultdict(lambda: [0, Decimal('0')])
+    for order_id, created_at, total_amount in Order.objects.filter(pk__in=signs).values_list(
+        'id', 'created_at', 'total_amount'
+    ):
+        day = days[timezone.localdate(created_at)]
+        day[0] += signs[order_id]
+        day[1] += signs[order_id] * total_amount
+
+    posts = {}
+    sellers = defaultdict(lambda: [0, Decimal('0')])
+    # Lines of deleted sellers only count towards the day, lines of deleted posts not towards the post
+    for order_id, post_id, seller_id, quantity, price in OrderItem.objects.filter(
+        order_id__in=signs, seller__isnull=False
+    ).values_list('order_id', 'post_id', 'seller_id', 'quantity', 'price'):
+        units = signs[order_id] * quantity
+        sellers[seller_id][0] += units
+        sellers[seller_id][1] += units * price
+        if post_id is not None:
+            post = posts.setdefault(post_id, [seller_id, 0, Decimal('0')])
+            post[1] += units
+            post[2] += units * price
+
+    add_totals(DailySales, 'date', ('order_count', 'revenue'), [(day, *totals) for day, totals in days.items()])
+    add_totals(PostSales, 'post', ('units_sold', 'revenue'), [(post_id, *row) for post_id, row in posts.items()],
+               attributes=('seller',))
+    add_totals(SellerSales, 'seller', ('units_sold', 'revenue'), [(seller_id, *totals) for seller_id, totals in sellers.items()])
+
+
+class SalesRollupSink:
+    """Apply order.created and order.cancelled events to the sales rollups.
+
+    Has to be listed in ORDER_EVENT_SINKS for the rollups to follow the orders,
+    dispatch_order_events runs it inside the transaction marking the batch.
+    """
+    def send(self, messages):
+        signs = Counter()
+        for message in messages:
+            if message['order_id'] is not None and message['type'] in EVENT_SIGNS:
+                signs[message['order_id']] += EVENT_SIGNS[message['type']]
+        if signs:
+            lock_rollups(shared=True)
+            apply_orders(signs)
+
+
+def counted_orders():
+    """The orders the rollups count: created and not cancelled, as far as the sink has seen.
+
+    Orders from before the outbox have no events, those count unless cancelled.
+    """
+    events = OrderEvent.objects.filter(order=OuterRef('pk'))
+    created = events.filter(event_type='order.created')
+    cancelled = events.filter(event_type='order.cancelled')
+    return Order.objects.filter(
+        Q(Exists(created.filter(dispatched_at__isnull=False))) | ~Q(Exists(created))
+    ).exclude(
+        Q(Exists(cancelled.filter(dispatched_at__isnull=False))) | Q(status='cancelled') & ~Q(Exists(cancelled))
+    )
+
+
+def insert_from(model, columns, queryset):
+    """INSERT the queryset's rows into the model's table, without loading them."""
+    table = model._meta.db_table
+    names = ', '.join(model._meta.get_field(name).column for name in columns)
+    sql, params = queryset.query.sql_with_params()
+    with connections[router.db_for_write(model)].cursor() as cursor:
+        cursor.execute(f'INSERT INTO {table} ({names}) {sql}', params)
+        return cursor.rowcount
+
+
+def rebuild():
+    """Recompute every rollup from the orders in one transaction, returns the rows written per model.
+
+    Dispatchers wait for it on the rollup lock, reports keep reading the old
+    rows until it commits.
+    """
+    with transaction.atomic():
+        lock_rollups(shared=False)
+        for model in (DailySales, PostSales, SellerSales):
+            model.objects.all().delete()
+        orders = counted_orders().order_by()
+        items = OrderItem.objects.filter(order__in=orders, seller__isnull=False).order_by()
+        revenue = Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+        return {
+            DailySales: insert_from(DailySales, ('date', 'order_count', 'revenue'), orders.values(
+                day=TruncDate('created_at')
+            ).annotate(order_count=Count('id'), revenue=Sum('total_amount'))),
+            PostSales: insert_from(PostSales, ('post', 'seller', 'units_sold', 'revenue'), items.filter(
+                post__isnull=False
+            ).values('post_id', 'seller_id').annotate(units_sold=Sum('quantity'), revenue=revenue)),
+            SellerSales: insert_from(SellerSales, ('seller', 'units_sold', 'revenue'), items.values(
+                'seller_id'
+            ).annotate(units_sold=Sum('quantity'), revenue=revenue)),
+        }
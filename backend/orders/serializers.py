@@ -1,8 +1,14 @@
+from decimal import Decimal
 from rest_framework import serializers
-from .models import Order, OrderItem, Cart, CartItem
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from .models import Order, OrderItem, Cart, CartItem, DailySales, PostSales, SellerSales, prefetch_items
+from core.fastpath import file_url_builder
+from core.serializers import SparseFieldsMixin
+from posts.models import PostImage
 from posts.serializers import PostSerializer
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     post = PostSerializer(read_only=True)
     post_id = serializers.IntegerField(write_only=True)
 
@@ -21,9 +27,51 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'updated_at')
 
     def get_total_amount(self, obj):
-        return sum(item.post.price * item.quantity for item in obj.items.all())
-
-class OrderItemSerializer(serializers.ModelSerializer):
+        # Annotated by Cart.objects.with_totals(), carts from elsewhere run the same aggregate
+        if not hasattr(obj, 'total_amount'):
+            return CartItem.objects.filter(cart=obj).summary()['total_amount']
+        return obj.total_amount
+
+# Operations one batch request may carry
+MAX_CART_OPERATIONS = 100
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=('add', 'set', 'remove'))
+    post_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'add' and attrs.get('quantity', 1) < 1:
+            raise serializers.ValidationError({'quantity': 'Must be at least 1 to add.'})
+        if attrs['op'] == 'set' and 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': 'This field is required to set.'})
+        return attrs
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = serializers.ListField(
+        child=CartOperationSerializer(), min_length=1, max_length=MAX_CART_OPERATIONS
+    )
+
+    def get_changes(self):
+        """Fold the operations, in order, into one (quantity, absolute) change per post."""
+        changes = {}
+        for operation in self.validated_data['operations']:
+            post_id = operation['post_id']
+            if operation['op'] == 'add':
+                quantity, absolute = changes.get(post_id, (0, False))
+                changes[post_id] = (quantity + operation.get('quantity', 1), absolute)
+            elif operation['op'] == 'set':
+                changes[post_id] = (operation['quantity'], True)
+            else:
+                changes[post_id] = (0, True)
+        return changes
+
+class CartSummarySerializer(serializers.Serializer):
+    item_count = serializers.IntegerField()
+    total_quantity = serializers.IntegerField()
+    total_amount = serializers.DecimalField(max_digits=12, decimal_places=2, coerce_to_string=False)
+
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     post = PostSerializer(read_only=True)
 
     class Meta:
@@ -40,6 +88,21 @@ class OrderSerializer(serializers.ModelSerializer):
                  'contact_info', 'items', 'created_at', 'updated_at')
         read_only_fields = ('id', 'user', 'created_at', 'updated_at')
 
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """An order history row, from the annotations of Order.objects.with_summary()."""
+    item_count = serializers.IntegerField(read_only=True)
+    total_quantity = serializers.IntegerField(read_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Order
+        fields = ('id', 'status', 'payment_method', 'total_amount', 'item_count', 'total_quantity',
+                  'thumbnail_url', 'created_at', 'updated_at')
+
+    def get_thumbnail_url(self, obj):
+        build_url = file_url_builder(PostImage._meta.get_field('image').storage, self.context.get('request'))
+        return build_url(obj.thumbnail)
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     contact_info = serializers.JSONField()
 
@@ -48,38 +111,59 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         fields = ('payment_method', 'shipping_address', 'contact_info')
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], prefetch_items(OrderItem))
         return OrderSerializer(instance, context=self.context).data
 
     def create(self, validated_data):
         user = self.context['request'].user
-        cart = user.cart
-
-        if not cart or not cart.items.exists():
-            raise serializers.ValidationError({"cart": "Cart is empty"})
-
         contact_info = validated_data.pop('contact_info', {})
-        
-        # Calculate total amount from cart
-        total_amount = sum(item.post.price * item.quantity for item in cart.items.all())
-
-        # Create order
-        order = Order.objects.create(
-            user=user,
-            total_amount=total_amount,
-            contact_info=contact_info,
-            **validated_data
-        )
-
-        # Create order items from cart items
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                post=cart_item.post,
-                quantity=cart_item.quantity,
-                price=cart_item.post.price
+
+        with transaction.atomic():
+            # One read of the lines with their posts, locked until commit, so a concurrent
+            # checkout waits and then finds the cart empty, and adds to these lines wait too
+            items = list(
+                CartItem.objects.filter(cart__user=user)
+                .select_related('post')
+                .select_for_update(of=('self',))
+                .order_by('id')
             )
+            if not items:
+                raise serializers.ValidationError({"cart": "Cart is empty"})
+
+            order = Order.objects.create(
+                user=user,
+                total_amount=sum((item.post.price * item.quantity for item in items), Decimal('0')),
+                contact_info=contact_info,
+                **validated_data
+            )
+            OrderItem.objects.bulk_create(
+                OrderItem(
+                    order=order, post=item.post, seller_id=item.post.user_id,
+                    quantity=item.quantity, price=item.post.price,
+                )
+                for item in items
+            )
+            order.record_event('order.created')
+            # Exactly the lines ordered, lines added meanwhile stay in the cart
+            CartItem.objects.remove_lines(items[0].cart_id, [item.pk for item in items])
+
+        return order 
+
+class DailySalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailySales
+        fields = ('date', 'order_count', 'revenue')
 
-        # Clear the cart
-        cart.items.all().delete()
+class PostSalesSerializer(serializers.ModelSerializer):
+    caption = serializers.CharField(source='post.caption', read_only=True)
 
-        return order 
\ No newline at end of file
+    class Meta:
+        model = PostSales
+        fields = ('post', 'caption', 'seller', 'units_sold', 'revenue')
+
+class SellerSalesSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='seller.username', read_only=True)
+
+    class Meta:
+        model = SellerSales
+        fields = ('seller', 'username', 'units_sold', 'revenue')
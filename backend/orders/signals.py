@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Cart, CartItem
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def touch_cart(sender, instance, **kwargs):
+    # Cart.updated_at is the cart's Last-Modified, item changes must move it
+    Cart.objects.filter(pk=instance.cart_id).update(updated_at=timezone.now())
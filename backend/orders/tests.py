@@ -1,3 +1,322 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from core.testing import NO_CACHE, QueryBudgetMixin
+from posts.models import Post, PostImage
+from users.models import CustomUser
+from .events import QueueSink, dispatch_batch
+from .models import (
+    Cart, CartItem, DailySales, InvalidTransition, Order, OrderEvent, OrderItem, PostSales, SellerSales
+)
+from .rollups import SalesRollupSink, rebuild
 
-# Create your tests here.
+IMAGES_PER_POST = 3
+CHECKOUT = {'payment_method': 'bank', 'shipping_address': 'Street 1', 'contact_info': {}}
+
+
+@override_settings(CACHES=NO_CACHE)
+class OrderQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query budgets of the cart, order and sales report read endpoints, 1 line per cart and order against 20.
+
+    Each conditional GET runs one aggregate for its ETag/Last-Modified validators first.
+    """
+    client_class = APIClient
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create(username='seller')
+        # Staff, so the sales reports list every seller and post
+        buyer = CustomUser.objects.create(username='buyer', is_staff=True)
+        self.client.force_authenticate(buyer)
+        self.cart = Cart.objects.create(user=buyer)
+        self.orders = [
+            Order.objects.create(user=buyer, payment_method='bank', total_amount=Decimal('0'), shipping_address='Street 1')
+            for _ in range(2)
+        ]
+        self.add_posts(1)
+
+    def add_posts(self, count):
+        posts = [
+            Post.objects.create(user=self.seller, caption=f'item {i}', price=Decimal('9.99'))
+            for i in range(count)
+        ]
+        # Image names only, the files themselves are never read while rendering
+        PostImage.objects.bulk_create(
+            PostImage(post=post, image=f'post-{post.id}-{i}.jpg')
+            for post in posts
+            for i in range(IMAGES_PER_POST)
+        )
+        CartItem.objects.bulk_create(CartItem(cart=self.cart, post=post, quantity=2) for post in posts)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, post=post, seller=self.seller, quantity=1, price=post.price)
+            for order in self.orders for post in posts
+        )
+        rebuild()
+
+    def grow(self):
+        self.add_posts(19)
+
+    def test_cart(self):
+        self.assertQueryBudget('/api/orders/cart/', 4, self.grow)
+
+    def test_cart_summary(self):
+        self.assertQueryBudget('/api/orders/cart/summary/', 1, self.grow)
+
+    def test_order_list(self):
+        self.assertQueryBudget('/api/orders/', 2, self.grow)
+
+    def test_order_detail(self):
+        self.assertQueryBudget(f'/api/orders/{self.orders[-1].id}/', 4, self.grow)
+
+    def test_daily_sales(self):
+        self.assertQueryBudget('/api/orders/reports/daily/', 1, self.grow)
+
+    def test_post_sales(self):
+        self.assertQueryBudget('/api/orders/reports/posts/', 1, self.grow)
+
+    def test_seller_sales(self):
+        self.assertQueryBudget('/api/orders/reports/sellers/', 1, self.grow)
+
+
+class OrderTransitionTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.buyer = CustomUser.objects.create(username='buyer')
+        self.order = Order.objects.create(
+            user=self.buyer, payment_method='bank', total_amount=Decimal('9.99'), shipping_address='Street 1'
+        )
+
+    def test_valid_moves_record_events(self):
+        self.order.transition('processing')
+        self.order.transition('completed')
+        self.assertEqual(Order.objects.get().status, 'completed')
+        self.assertEqual(
+            list(self.order.events.order_by('id').values_list('event_type', 'payload__previous_status')),
+            [('order.processing', 'pending'), ('order.completed', 'processing')],
+        )
+
+    def test_invalid_moves(self):
+        with self.assertRaises(InvalidTransition):
+            self.order.transition('completed')
+        self.order.transition('processing')
+        with self.assertRaises(InvalidTransition):
+            self.order.transition('cancelled', only_from=('pending',))
+        self.assertEqual(Order.objects.get().status, 'processing')
+        self.assertEqual(self.order.events.count(), 1)
+
+    def test_event_in_the_same_transaction(self):
+        with mock.patch.object(Order, 'record_event', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.order.transition('processing')
+        self.assertEqual(Order.objects.get().status, 'pending')
+
+    def test_cancel(self):
+        self.client.force_authenticate(self.buyer)
+        response = self.client.patch(f'/api/orders/{self.order.id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.order.events.get().event_type, 'order.cancelled')
+
+    def test_cancel_after_processing_started(self):
+        self.client.force_authenticate(self.buyer)
+        # Read while pending, moved on before the cancel locks it
+        stale = Order.objects.get()
+        Order.objects.filter(pk=self.order.pk).update(status='processing')
+        with mock.patch('orders.views.OrderCancelView.get_object', return_value=stale):
+            response = self.client.patch(f'/api/orders/{self.order.id}/cancel/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Order.objects.get().status, 'processing')
+        self.assertFalse(self.order.events.exists())
+
+
+class FailingSink:
+    """Fails every batch holding one of the event ids in fail_on, or every batch at all."""
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+
+    def send(self, messages):
+        if self.fail_on is None or any(message['id'] in self.fail_on for message in messages):
+            raise RuntimeError('sink failed')
+
+
+class OrderEventDispatchTests(TestCase):
+    def setUp(self):
+        while not QueueSink.queue.empty():
+            QueueSink.queue.get_nowait()
+        order = Order.objects.create(
+            user=CustomUser.objects.create(username='buyer'), payment_method='bank',
+            total_amount=Decimal('9.99'), shipping_address='Street 1',
+        )
+        self.events = [order.record_event('order.created') for _ in range(4)]
+
+    def test_delivers_and_marks_dispatched(self):
+        self.assertEqual(dispatch_batch([QueueSink()], 10), 4)
+        delivered = [QueueSink.queue.get_nowait()['id'] for _ in range(4)]
+        self.assertEqual(delivered, [event.id for event in self.events])
+        self.assertFalse(OrderEvent.objects.pending().exists())
+        self.assertEqual(set(OrderEvent.objects.values_list('attempts', flat=True)), {1})
+
+    def test_failing_sink_leaves_batch_pending(self):
+        with self.assertRaisesMessage(RuntimeError, 'sink failed'):
+            dispatch_batch([QueueSink(), FailingSink()], 10)
+        self.assertEqual(OrderEvent.objects.pending().count(), 4)
+        self.assertEqual(set(OrderEvent.objects.values_list('attempts', 'last_error')), {(1, "RuntimeError('sink failed')")})
+
+    @override_settings(ORDER_EVENT_MAX_ATTEMPTS=2)
+    def test_parks_event_failing_on_its_own(self):
+        bad = self.events[1]
+        sinks = [FailingSink(fail_on={bad.id})]
+        with self.assertLogs('orders.events', 'WARNING'):
+            self.assertEqual(dispatch_batch(sinks, 10), 3)
+            self.assertEqual(list(OrderEvent.objects.pending()), [bad])
+            # Alone in its batch, it could be the sink failing, so it stays pending
+            with self.assertRaises(RuntimeError):
+                dispatch_batch(sinks, 10)
+            later = bad.order.record_event('order.processing')
+            self.assertEqual(dispatch_batch(sinks, 10), 1)
+        self.assertFalse(OrderEvent.objects.pending().exists())
+        self.assertEqual(list(OrderEvent.objects.parked()), [bad])
+        self.assertIsNotNone(OrderEvent.objects.get(pk=later.pk).dispatched_at)
+
+
+class SalesRollupTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        seller = CustomUser.objects.create(username='seller')
+        self.posts = [Post.objects.create(user=seller, caption=f'item {i}', price=Decimal('9.99')) for i in range(2)]
+        self.client.force_authenticate(CustomUser.objects.create(username='buyer'))
+
+    def checkout(self, *posts):
+        for post in posts:
+            self.client.post('/api/orders/cart/add/', {'post_id': post.id, 'quantity': 2}, format='json')
+        return Order.objects.get(pk=self.client.post('/api/orders/create/', CHECKOUT, format='json').data['id'])
+
+    def snapshot(self):
+        # Rows cancelled down to zero only disappear with a rebuild
+        return (
+            set(DailySales.objects.exclude(order_count=0).values_list('date', 'order_count', 'revenue')),
+            set(PostSales.objects.exclude(units_sold=0).values_list('post_id', 'seller_id', 'units_sold', 'revenue')),
+            set(SellerSales.objects.exclude(units_sold=0).values_list('seller_id', 'units_sold', 'revenue')),
+        )
+
+    def test_cancel_after_post_deleted(self):
+        self.checkout(*self.posts)
+        cancelled = self.checkout(self.posts[0])
+        sinks = [SalesRollupSink()]
+        dispatch_batch(sinks, 100)
+        self.posts[0].delete()
+        cancelled.transition('cancelled')
+        dispatch_batch(sinks, 100)
+        applied = self.snapshot()
+        self.assertEqual(SellerSales.objects.get().units_sold, 4)
+        rebuild()
+        self.assertEqual(self.snapshot(), applied)
+
+
+class AddToCartConcurrencyTests(TransactionTestCase):
+    """Parallel adds of the same post, each on its own connection, must not lose an increment."""
+    threads = 16
+    adds = 300
+
+    def test_concurrent_adds(self):
+        seller = CustomUser.objects.create(username='seller')
+        buyer = CustomUser.objects.create(username='buyer')
+        post = Post.objects.create(user=seller, caption='item', price=Decimal('9.99'))
+        # Released together, so the first adds also race to create the cart
+        barrier = threading.Barrier(self.threads)
+
+        def add(i):
+            try:
+                if i < self.threads:
+                    barrier.wait()
+                Cart.objects.add_item(buyer, post.id, 1)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            list(executor.map(add, range(self.adds)))
+        self.assertEqual(Cart.objects.filter(user=buyer).count(), 1)
+        self.assertEqual(CartItem.objects.get(cart__user=buyer, post=post).quantity, self.adds)
+
+
+class IdempotentCheckoutTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.post = Post.objects.create(user=CustomUser.objects.create(username='seller'), caption='item', price=Decimal('9.99'))
+        self.client.force_authenticate(self.add_buyer('buyer'))
+
+    def add_buyer(self, username):
+        buyer = CustomUser.objects.create(username=username)
+        Cart.objects.add_item(buyer, self.post.id, 2)
+        return buyer
+
+    def checkout(self, key='checkout-1', client=None, **data):
+        return (client or self.client).post('/api/orders/create/', {**CHECKOUT, **data}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay(self):
+        first = self.checkout()
+        replay = self.checkout()
+        self.assertEqual((first.status_code, replay.status_code), (201, 201))
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.content, first.content)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_for_another_request(self):
+        self.checkout()
+        self.assertEqual(self.checkout(shipping_address='Street 2').status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_server_error_is_not_stored(self):
+        with self.assertLogs('django.request', 'ERROR'):
+            with mock.patch('orders.views.OrderCreateView.create', return_value=Response(status=503)):
+                self.assertEqual(self.checkout().status_code, 503)
+            with mock.patch('orders.views.OrderCreateView.perform_create', side_effect=RuntimeError):
+                with self.assertRaises(RuntimeError):
+                    self.checkout()
+        retry = self.checkout()
+        self.assertEqual(retry.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', retry)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_keys_are_per_user(self):
+        other = APIClient()
+        other.force_authenticate(self.add_buyer('other'))
+        self.assertEqual(self.checkout().status_code, 201)
+        response = self.checkout(client=other)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class IdempotentCheckoutConcurrencyTests(TransactionTestCase):
+    """Duplicates of one checkout sent in parallel, each on its own connection, must place one order."""
+    threads = 8
+
+    def test_concurrent_duplicates(self):
+        post = Post.objects.create(user=CustomUser.objects.create(username='seller'), caption='item', price=Decimal('9.99'))
+        buyer = CustomUser.objects.create(username='buyer')
+        Cart.objects.add_item(buyer, post.id, 1)
+        barrier = threading.Barrier(self.threads)
+
+        def checkout(i):
+            client = APIClient()
+            client.force_authenticate(buyer)
+            try:
+                barrier.wait()
+                return client.post('/api/orders/create/', CHECKOUT, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            responses = list(executor.map(checkout, range(self.threads)))
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual({response.status_code for response in responses}, {201})
+        self.assertEqual(sum('Idempotent-Replayed' in response for response in responses), self.threads - 1)
+        self.assertEqual(len({response.content for response in responses}), 1)
@@ -6,7 +6,9 @@ app_name = 'orders'
 urlpatterns = [
     # Cart endpoints
     path('cart/', views.CartView.as_view(), name='cart'),
+    path('cart/summary/', views.CartSummaryView.as_view(), name='cart-summary'),
     path('cart/add/', views.AddToCartView.as_view(), name='add-to-cart'),
+    path('cart/batch/', views.CartBatchView.as_view(), name='cart-batch'),
     path('cart/remove/<int:pk>/', views.RemoveFromCartView.as_view(), name='remove-from-cart'),
     path('cart/update/<int:pk>/', views.UpdateCartItemView.as_view(), name='update-cart-item'),
     
@@ -15,4 +17,9 @@ urlpatterns = [
     path('<int:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('create/', views.OrderCreateView.as_view(), name='order-create'),
     path('<int:pk>/cancel/', views.OrderCancelView.as_view(), name='order-cancel'),
+
+    # Sales report endpoints
+    path('reports/daily/', views.DailySalesReportView.as_view(), name='report-daily'),
+    path('reports/posts/', views.PostSalesReportView.as_view(), name='report-posts'),
+    path('reports/sellers/', views.SellerSalesReportView.as_view(), name='report-sellers'),
 ] 
\ No newline at end of file
@@ -1,55 +1,103 @@
 from django.shortcuts import render
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from .models import Cart, CartItem, Order
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils.dateparse import parse_date
+from core.conditional import ConditionalGetMixin
+from core.fastpath import use_fast_read_path
+from core.pagination import KeysetPagination
+from core.renderers import FastJSONRenderer
+from .fastpath import ORDER_SUMMARY_VALUES, OrderSummaryRenderer
+from .idempotency import idempotent
+from .models import Cart, CartItem, DailySales, InvalidTransition, Order, PostSales, SellerSales, prefetch_items
 from .serializers import (
-    CartSerializer, CartItemSerializer,
-    OrderSerializer, OrderCreateSerializer
+    CartBatchSerializer, CartSerializer, CartItemSerializer, CartSummarySerializer,
+    OrderSerializer, OrderCreateSerializer, OrderSummarySerializer,
+    DailySalesSerializer, PostSalesSerializer, SellerSalesSerializer
 )
-from posts.models import Post
 
 # Create your views here.
 
-class CartView(generics.RetrieveAPIView):
+class CartView(ConditionalGetMixin, generics.RetrieveAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = CartSerializer
+    last_modified_fields = ('updated_at', 'items__post__updated_at', 'items__post__user__updated_at')
+    count_field = 'items'
+
+    def get_validator_queryset(self):
+        return Cart.objects.filter(user=self.request.user)
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'compact': True}
 
     def get_object(self):
-        cart, _ = Cart.objects.get_or_create(user=self.request.user)
+        cart, _ = Cart.objects.with_items().with_totals().get_or_create(user=self.request.user)
         return cart
 
+class CartSummaryView(APIView):
+    """Counts and total of the user's cart from one aggregate, for the header badge."""
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        summary = CartItem.objects.filter(cart__user=request.user).summary()
+        return Response(CartSummarySerializer(summary).data)
+
 class AddToCartView(APIView):
     permission_classes = (IsAuthenticated,)
 
+    @idempotent
     def post(self, request):
         post_id = request.data.get('post_id')
-        quantity = int(request.data.get('quantity', 1))
-
         if not post_id:
             return Response({'error': 'Post ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            post_id = int(post_id)
+            quantity = int(request.data.get('quantity', 1))
+        except (TypeError, ValueError):
+            return Response({'error': 'Post ID and quantity must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if quantity < 1:
+            return Response({'error': 'Quantity must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One statement for the cart, the item and the increment
+        cart = Cart.objects.add_item(request.user, post_id, quantity)
+        if cart is None:
+            return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        prefetch_related_objects([cart], prefetch_items(CartItem))
+        serializer = CartSerializer(cart, context={'request': request, 'compact': True})
+        return Response(serializer.data)
 
-        post = get_object_or_404(Post, id=post_id)
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            post=post,
-            defaults={'quantity': quantity}
-        )
-
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
+class CartBatchView(APIView):
+    """Add, set and remove several cart lines in one transaction, returns the cart once."""
+    permission_classes = (IsAuthenticated,)
 
-        serializer = CartSerializer(cart)
+    @idempotent
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            cart = Cart.objects.apply_changes(request.user, serializer.get_changes())
+            if cart.missing_posts:
+                transaction.set_rollback(True)
+                return Response(
+                    {'error': 'Post not found', 'post_ids': sorted(cart.missing_posts)},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+
+        prefetch_related_objects([cart], prefetch_items(CartItem))
+        serializer = CartSerializer(cart, context={'request': request, 'compact': True})
         return Response(serializer.data)
 
 class RemoveFromCartView(APIView):
     permission_classes = (IsAuthenticated,)
 
+    @idempotent
     def delete(self, request, pk):
         cart_item = get_object_or_404(CartItem, id=pk, cart__user=request.user)
         cart_item.delete()
@@ -58,8 +106,11 @@ class RemoveFromCartView(APIView):
 class UpdateCartItemView(APIView):
     permission_classes = (IsAuthenticated,)
 
+    @idempotent
     def patch(self, request, pk):
-        cart_item = get_object_or_404(CartItem, id=pk, cart__user=request.user)
+        cart_item = get_object_or_404(
+            CartItem.objects.select_related('post__user'), id=pk, cart__user=request.user
+        )
         quantity = request.data.get('quantity')
 
         if quantity is None:
@@ -75,24 +126,51 @@ class UpdateCartItemView(APIView):
         serializer = CartItemSerializer(cart_item)
         return Response(serializer.data)
 
-class OrderListView(generics.ListAPIView):
+class OrderHistoryPagination(KeysetPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class OrderListView(ConditionalGetMixin, generics.ListAPIView):
+    """The user's order history, newest first, as compact summaries. OrderDetailView has the items."""
     permission_classes = (IsAuthenticated,)
-    serializer_class = OrderSerializer
+    serializer_class = OrderSummarySerializer
+    pagination_class = OrderHistoryPagination
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    # Only the orders' own rows, so the validators stay an index scan however long the history.
+    # A cover image processed later shows up with the order's next change.
+    last_modified_fields = ('updated_at',)
+
+    def get_validator_queryset(self):
+        # Without the summary subqueries, the aggregate would run them for every order
+        return Order.objects.filter(user=self.request.user)
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.with_summary().filter(user=self.request.user).order_by('-created_at', '-id')
+
+    def list(self, request, *args, **kwargs):
+        if not use_fast_read_path(request):
+            return super().list(request, *args, **kwargs)
+        # Same payload as the serializer, rendered from value rows
+        rows = self.paginate_queryset(self.filter_queryset(self.get_queryset()).values(*ORDER_SUMMARY_VALUES))
+        return self.get_paginated_response(OrderSummaryRenderer(request).render(rows))
 
-class OrderDetailView(generics.RetrieveAPIView):
+class OrderDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = OrderSerializer
+    last_modified_fields = ('updated_at', 'items__post__updated_at', 'items__post__user__updated_at')
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.with_items().filter(user=self.request.user)
 
 class OrderCreateView(generics.CreateAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = OrderCreateSerializer
 
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save()
 
@@ -101,7 +179,64 @@ class OrderCancelView(generics.UpdateAPIView):
     serializer_class = OrderSerializer
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user, status='pending')
+        return Order.objects.with_items().filter(user=self.request.user, status='pending')
+
+    def update(self, request, *args, **kwargs):
+        order = self.get_object()
+        try:
+            # Customers can only cancel orders nobody started processing
+            order.transition('cancelled', only_from=('pending',))
+        except InvalidTransition as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(order).data)
+
+# Sales reports, read from the rollups kept by orders.rollups, never from the orders
+
+class SalesReportPagination(KeysetPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+class DailySalesReportView(generics.ListAPIView):
+    """Orders and revenue per day, oldest first, optionally between ?from= and ?to= (inclusive)."""
+    permission_classes = (IsAdminUser,)
+    serializer_class = DailySalesSerializer
+    pagination_class = SalesReportPagination
+
+    def get_queryset(self):
+        queryset = DailySales.objects.order_by('date')
+        for param, lookup in (('from', 'date__gte'), ('to', 'date__lte')):
+            value = self.request.query_params.get(param)
+            if value:
+                try:
+                    day = parse_date(value)
+                except ValueError:
+                    day = None
+                if day is None:
+                    raise ValidationError({param: 'Expected a date as YYYY-MM-DD'})
+                queryset = queryset.filter(**{lookup: day})
+        return queryset
+
+class PostSalesReportView(generics.ListAPIView):
+    """Units sold and revenue per post, best selling first. Sellers see their own posts, staff all of them."""
+    permission_classes = (IsAuthenticated,)
+    serializer_class = PostSalesSerializer
+    pagination_class = SalesReportPagination
+
+    def get_queryset(self):
+        queryset = PostSales.objects.select_related('post').order_by('-revenue')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(seller=self.request.user)
+        return queryset
 
-    def perform_update(self, serializer):
-        serializer.save(status='cancelled')
+class SellerSalesReportView(generics.ListAPIView):
+    """Units sold and revenue per seller, best selling first. Sellers see their own totals, staff everyone's."""
+    permission_classes = (IsAuthenticated,)
+    serializer_class = SellerSalesSerializer
+    pagination_class = SalesReportPagination
+
+    def get_queryset(self):
+        queryset = SellerSales.objects.select_related('seller').order_by('-revenue')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(seller=self.request.user)
+        return queryset
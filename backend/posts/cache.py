@@ -0,0 +1,81 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from core.fastpath import SHAPE_PARAMS
+
+GENERATION_KEY = 'posts:generation'
+
+# Query params that change the post list payload, with the value used when absent
+LIST_PARAMS = {
+    'search': '',
+    'sort': '-created_at',
+    'page': '1',
+    'page_size': '',
+    'pagination': '',
+    'cursor': '',
+    'min_price': '',
+    'max_price': '',
+    'seller': '',
+    'created_after': '',
+    'created_before': '',
+    **{name: '' for name in SHAPE_PARAMS},
+}
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so an evicted counter never reuses an old generation
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Invalidate every cached post response."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def normalize_list_params(query_params):
+    params = {}
+    for name, default in LIST_PARAMS.items():
+        value = query_params.get(name, '').strip() or default
+        params[name] = value.lower() if name == 'search' else value
+    return params
+
+
+class CachedResponseMixin:
+    """Serve GET responses from the cache until a post or image changes.
+
+    Keys embed the current generation, so bumping it from signals orphans
+    every cached entry at once without having to know which keys exist.
+    Behind ConditionalGetMixin they embed its validators as well: the default
+    cache is per process, so writes from management commands and the image
+    pool can't bump the workers' generation, but they do move the validators.
+    """
+    cache_prefix = None
+
+    def get_cache_params(self, request, *args, **kwargs):
+        return {**kwargs, **{name: request.query_params.get(name, '') for name in SHAPE_PARAMS}}
+
+    def get_cache_key(self, request, *args, **kwargs):
+        params = self.get_cache_params(request, *args, **kwargs)
+        # Image URLs are absolute, so the host is part of the payload
+        raw = repr((request.scheme, request.get_host(), sorted(params.items()), getattr(self, 'validators', None)))
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f'posts:{self.cache_prefix}:{get_generation()}:{digest}'
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_cache_key(request, *args, **kwargs)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.POSTS_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,83 @@
+from django.db.models import Count, Q
+from rest_framework import serializers
+from .search import search_posts
+
+# Upper edges of the price facet buckets, the last bucket is open ended
+PRICE_BUCKET_EDGES = (10, 25, 50, 100, 250, 500, 1000)
+TOP_SELLERS_LIMIT = 10
+
+
+class PostFilterSerializer(serializers.Serializer):
+    search = serializers.CharField(required=False, allow_blank=True, trim_whitespace=True)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=0)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=0)
+    seller = serializers.IntegerField(required=False, min_value=1)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        min_price, max_price = attrs.get('min_price'), attrs.get('max_price')
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise serializers.ValidationError({'min_price': 'Must not be greater than max_price.'})
+        return attrs
+
+
+def filter_posts(queryset, query_params):
+    """Apply the search and facet filters from the query string.
+
+    Raises ValidationError (HTTP 400) for malformed filter values.
+    """
+    params = {key: value for key, value in query_params.items() if value != ''}
+    serializer = PostFilterSerializer(data=params)
+    serializer.is_valid(raise_exception=True)
+    filters = serializer.validated_data
+
+    if filters.get('search'):
+        queryset = search_posts(queryset, filters['search'])
+    if 'min_price' in filters:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if 'max_price' in filters:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    if 'seller' in filters:
+        queryset = queryset.filter(user_id=filters['seller'])
+    if 'created_after' in filters:
+        queryset = queryset.filter(created_at__gte=filters['created_after'])
+    if 'created_before' in filters:
+        queryset = queryset.filter(created_at__lt=filters['created_before'])
+    return queryset
+
+
+def get_facets(queryset):
+    """Price bucket and top seller counts for an already filtered queryset.
+
+    All price buckets come from a single aggregate with filtered counts,
+    the top sellers from one GROUP BY.
+    """
+    queryset = queryset.order_by()
+    bounds = [None, *PRICE_BUCKET_EDGES, None]
+    aggregates = {'total': Count('pk')}
+    for i, (low, high) in enumerate(zip(bounds, bounds[1:])):
+        condition = Q()
+        if low is not None:
+            condition &= Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        aggregates[f'bucket_{i}'] = Count('pk', filter=condition)
+    counts = queryset.aggregate(**aggregates)
+
+    top_sellers = (
+        queryset.values('user_id', 'user__username')
+        .annotate(count=Count('pk'))
+        .order_by('-count', 'user_id')[:TOP_SELLERS_LIMIT]
+    )
+    return {
+        'total': counts['total'],
+        'price_buckets': [
+            {'min': low, 'max': high, 'count': counts[f'bucket_{i}']}
+            for i, (low, high) in enumerate(zip(bounds, bounds[1:]))
+        ],
+        'top_sellers': [
+            {'id': row['user_id'], 'username': row['user__username'], 'count': row['count']}
+            for row in top_sellers
+        ],
+    }
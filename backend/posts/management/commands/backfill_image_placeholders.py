@@ -0,0 +1,73 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core import images
+from posts.cache import bump_generation
+from posts.models import Post, PostImage
+
+
+class Command(BaseCommand):
+    help = 'Compute the size and placeholder of post images stored before they were kept'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recompute images that already have a placeholder')
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows per UPDATE')
+
+    def handle(self, *args, **options):
+        queryset = PostImage.objects.exclude(image='')
+        if not options['force']:
+            queryset = queryset.filter(placeholder='')
+        executor = images.get_executor()
+        # Bounded, so a large backlog doesn't queue every job up front
+        limit = max(settings.IMAGE_PIPELINE_WORKERS, 1) * 4
+        # Shared content is decoded once for every row that names it
+        pending = {}
+        rows_by_name = {}
+        finished_rows = []
+        done = failed = 0
+
+        def flush():
+            if not finished_rows:
+                return
+            PostImage.objects.bulk_update(finished_rows, ['width', 'height', 'placeholder'])
+            # The summary is part of the post payload, move its validators along
+            Post.objects.filter(pk__in={row.post_id for row in finished_rows}).update(updated_at=timezone.now())
+            # Neither update sends signals, drop the cached payloads here
+            transaction.on_commit(bump_generation)
+            finished_rows.clear()
+
+        def collect(futures):
+            nonlocal done, failed
+            for future in futures:
+                name = pending.pop(future)
+                rows = rows_by_name.pop(name)
+                try:
+                    summary = future.result()
+                except Exception as exc:
+                    failed += len(rows)
+                    self.stderr.write(f'{name}: {exc}')
+                    continue
+                for row in rows:
+                    row.set_summary(summary)
+                finished_rows.extend(rows)
+                done += len(rows)
+                if len(finished_rows) >= options['batch_size']:
+                    flush()
+
+        for row in queryset.only('id', 'post_id', 'image', 'width', 'height', 'placeholder').iterator(chunk_size=500):
+            if row.image.name in rows_by_name:
+                rows_by_name[row.image.name].append(row)
+                continue
+            rows_by_name[row.image.name] = [row]
+            future = executor.submit(images.run_summary_job, PostImage._meta.label, 'image', row.image.name)
+            pending[future] = row.image.name
+            if len(pending) >= limit:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+        collect(wait(pending).done)
+        flush()
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {done} images, {failed} failed'))
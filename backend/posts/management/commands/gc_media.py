@@ -0,0 +1,116 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from posts.models import ImageBlob, PostImage
+
+
+def referenced_names(sql, chunk_size):
+    """Stream the names a query returns through a server side cursor, chunk by chunk."""
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(sql)
+        while rows := cursor.fetchmany(chunk_size):
+            for (name,) in rows:
+                yield name
+
+
+def file_columns_sql(table, file_column, variants_column):
+    # The file itself and every variant in its manifest, skipping the manifest's source entry
+    return (
+        f"SELECT {file_column} AS name FROM {table} WHERE {file_column} <> '' "
+        f"UNION ALL SELECT variant.value ->> 'name' FROM {table}, jsonb_each({table}.{variants_column}) AS variant "
+        f"WHERE jsonb_typeof(variant.value) = 'object'"
+    )
+
+
+def sorted_sql(sql):
+    # Byte order, the same order storage listings come in
+    return f'SELECT name FROM ({sql}) AS refs ORDER BY name COLLATE "C"'
+
+
+def post_media_sql():
+    image_table = PostImage._meta.db_table
+    blob_table = ImageBlob._meta.db_table
+    return sorted_sql(f"{file_columns_sql(image_table, 'image', 'variants')} UNION ALL SELECT name FROM {blob_table}")
+
+
+def profile_media_sql():
+    return sorted_sql(file_columns_sql(get_user_model()._meta.db_table, 'profile_photo', 'photo_variants'))
+
+
+def find_orphans(files, names):
+    """Merge two name ordered streams, yielding the files no name refers to."""
+    names = iter(names)
+    current = next(names, None)
+    for file in files:
+        while current is not None and current < file[0]:
+            current = next(names, None)
+        if current != file[0]:
+            yield file
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Delete stored post images and profile photos that no database row refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report orphans without deleting anything')
+        parser.add_argument(
+            '--min-age', type=float,
+            default=settings.DIRECT_UPLOAD_CONFIRM_MAX_AGE / 3600 + 1,
+            help='Hours a file must have existed, so uploads whose rows are not committed yet are kept',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Names per delete call and cursor fetch')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(hours=options['min_age'])
+        batch_size = options['batch_size']
+
+        # Blobs nobody has referenced for the whole grace period, their files go below.
+        # Ones released before released_at existed fall back to their creation time.
+        blobs = ImageBlob.objects.filter(
+            Q(released_at__lt=cutoff) | Q(released_at__isnull=True, created_at__lt=cutoff), ref_count=0,
+        )
+        if dry_run:
+            self.stdout.write(f'unreferenced blobs: {blobs.count()}')
+        else:
+            deleted = 0
+            while ids := list(blobs.values_list('pk', flat=True)[:batch_size]):
+                deleted += ImageBlob.objects.filter(pk__in=ids, ref_count=0).delete()[0]
+            self.stdout.write(f'unreferenced blobs deleted: {deleted}')
+
+        targets = (
+            ('posts', PostImage._meta.get_field('image').storage, post_media_sql()),
+            ('profiles', get_user_model()._meta.get_field('profile_photo').storage, profile_media_sql()),
+        )
+        for label, storage, sql in targets:
+            files = storage.iter_files()
+            orphans = (
+                (name, size) for name, modified, size in find_orphans(files, referenced_names(sql, batch_size))
+                if modified < cutoff
+            )
+            found = freed = failed = 0
+            for batch in batched(orphans, batch_size):
+                found += len(batch)
+                freed += sum(size for _, size in batch)
+                if dry_run:
+                    for name, _ in batch:
+                        self.stdout.write(f'  {name}', self.style.NOTICE)
+                else:
+                    failed += len(storage.delete_many([name for name, _ in batch]))
+            action = 'would delete' if dry_run else 'deleted'
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: {action} {found - failed} orphaned files, {freed / 2 ** 20:.1f}MB'
+                + (f', {failed} failed' if failed else '')
+            ))
@@ -0,0 +1,49 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from core import images
+from posts.models import PostImage
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or outdated image variants for post images and profile photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that are up to date')
+
+    def handle(self, *args, **options):
+        sources = (
+            (PostImage.objects.exclude(image=''), 'image'),
+            (get_user_model().objects.exclude(profile_photo='').exclude(profile_photo=None), 'profile_photo'),
+        )
+        executor = images.get_executor()
+        # Bounded, so a large backlog doesn't queue every job up front
+        limit = max(settings.IMAGE_PIPELINE_WORKERS, 1) * 4
+        pending = {}
+        done = failed = 0
+
+        def collect(futures):
+            nonlocal done, failed
+            for future in futures:
+                instance = pending.pop(future)
+                try:
+                    instance.store_variants(future.result())
+                    done += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{instance._meta.label} {instance.pk}: {exc}')
+
+        for queryset, field_name in sources:
+            for instance in queryset.iterator(chunk_size=500):
+                if not options['force'] and not instance.needs_variants:
+                    continue
+                args = (instance._meta.label, field_name, getattr(instance, field_name).name, instance.variant_stem())
+                pending[executor.submit(images.run_job, *args)] = instance
+                if len(pending) >= limit:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+        collect(wait(pending).done)
+
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {done} images, {failed} failed'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-18 19:37
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_alter_postimage_options_remove_postimage_order_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE posts_post AS p
+                SET search_vector =
+                    setweight(to_tsvector('english', p.caption), 'A') ||
+                    setweight(to_tsvector('simple', u.username), 'B')
+                FROM users_customuser AS u
+                WHERE u.id = p.user_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently so the posts table stays writable
+    atomic = False
+
+    dependencies = [
+        ('posts', '0004_post_search_vector'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['price', 'id'], name='post_price_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['created_at', 'id'], name='post_created_at_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['user', 'created_at'], name='post_user_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('posts', '0005_post_filter_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['caption'], name='post_caption_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+        ),
+    ]
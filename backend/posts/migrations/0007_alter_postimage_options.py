@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_caption_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='postimage',
+            options={'ordering': ['created_at', 'id']},
+        ),
+    ]
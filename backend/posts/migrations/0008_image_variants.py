@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_alter_postimage_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
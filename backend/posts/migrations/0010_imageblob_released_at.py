@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblob',
+            name='released_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('posts', '0011_image_placeholders'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=['caption'], name='post_caption_gist_trgm_idx', opclasses=['gist_trgm_ops']
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name='post',
+            name='post_caption_trgm_idx',
+        ),
+    ]
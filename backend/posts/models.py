@@ -1,13 +1,188 @@
 from django.db import models
 from django.conf import settings
-from core.storage_backends import get_post_storage
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVectorField
+from core.derivatives import source_version
+from core.images import IMAGE_FORMATS, needs_variants, read_image_header, schedule, variant_url
+from core.storage_backends import ContentAddressedStore, get_post_storage
+from core.uploads import delete_files, save_files
+from django.db import connections, transaction
 from django.utils import timezone
+from .search import build_search_vector
+from collections import Counter, namedtuple
+from datetime import timedelta
 import os
+import uuid
 
 def post_image_path(instance, filename):
     # Generate path for post image
     ext = filename.split('.')[-1]
-    return f'post-{instance.post.id}-{instance.id}.{ext}'
+    # Not the image id, names are picked before the rows are inserted
+    return f'post-{instance.post_id}-{uuid.uuid4().hex}.{ext}'
+
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        # Everything PostSerializer renders, in a fixed number of queries
+        return self.select_related('user').prefetch_related('images')
+
+# An upload ready for content addressed storage, the extension follows the format
+HashedImage = namedtuple('HashedImage', 'digest extension file width height')
+
+def hash_image_files(files):
+    hashed_files = []
+    for file in files:
+        format, width, height = read_image_header(file)
+        hashed_files.append(HashedImage(ContentAddressedStore.digest(file), IMAGE_FORMATS[format], file, width, height))
+    return hashed_files
+
+class ImageBlobQuerySet(models.QuerySet):
+    def store_missing(self, store, hashed_files):
+        """Upload the content that isn't stored yet, concurrently.
+
+        Returns ({digest: name} already stored, {digest: name} uploaded now).
+        """
+        digests = {hashed.digest for hashed in hashed_files}
+        # Unreferenced blobs may be garbage collected any moment, their content is stored again
+        known = dict(self.filter(sha256__in=digests, ref_count__gt=0).values_list('sha256', 'name'))
+        new = {}
+        for digest, extension, file, _, _ in hashed_files:
+            if digest not in known and digest not in new:
+                new[digest] = (store.key(digest, extension), file)
+        names = save_files(store.storage, [key for key, _ in new.values()], [file for _, file in new.values()])
+        return known, dict(zip(new, names))
+
+    def add_references(self, hashed_files, names):
+        """Count one reference per file, inserting blobs for new content. Returns {digest: blob}.
+
+        A concurrent request may have inserted the same content first, the
+        returned blob then names its file instead of ours.
+        """
+        counts = Counter(hashed.digest for hashed in hashed_files)
+        sizes = {hashed.digest: hashed.file.size for hashed in hashed_files}
+        # Sorted, so concurrent uploads lock the rows in the same order
+        digests = sorted(counts)
+        table = self.model._meta.db_table
+        values = ', '.join(['(%s, %s, %s, %s, now())'] * len(digests))
+        params = [value for digest in digests for value in (digest, names[digest], sizes[digest], counts[digest])]
+        blobs = self.raw(
+            f'INSERT INTO {table} (sha256, name, size, ref_count, created_at) VALUES {values} '
+            f'ON CONFLICT (sha256) DO UPDATE SET ref_count = {table}.ref_count + EXCLUDED.ref_count, '
+            f'name = CASE WHEN {table}.ref_count = 0 THEN EXCLUDED.name ELSE {table}.name END '
+            f'RETURNING *',
+            params,
+            using=self.db,
+        )
+        return {blob.sha256: blob for blob in blobs}
+
+    def release(self, blob_ids):
+        """Drop references, blobs left without any are kept until garbage collected."""
+        counts = Counter(blob_ids)
+        if not counts:
+            return
+        table = self.model._meta.db_table
+        values = ', '.join(['(%s, %s)'] * len(counts))
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} AS blob SET ref_count = GREATEST(blob.ref_count - released.count, 0), '
+                f'released_at = now() '
+                f'FROM (VALUES {values}) AS released (id, count) WHERE blob.id = released.id',
+                [value for item in sorted(counts.items()) for value in item],
+            )
+
+class ImageBlob(models.Model):
+    """A stored image file, shared by every PostImage with the same content."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last time a reference was dropped, gc_media waits a grace period after it
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ImageBlobQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+class PostImageQuerySet(models.QuerySet):
+    def create_from_files(self, post, files):
+        """Store uploaded files and insert their PostImage rows in one query.
+
+        Files are keyed by their content. Bytes that are already stored are
+        not uploaded again, the rest is uploaded concurrently and deleted
+        again if an upload or the insert fails.
+        """
+        return self._create_from_hashed(post, hash_image_files(files))
+
+    def replace_from_files(self, post, files):
+        """Make files the images of post, existing images with the same content are kept."""
+        hashed_files = hash_image_files(files)
+        existing = {}
+        for image in post.images.select_related('blob'):
+            if image.blob is not None:
+                existing.setdefault(image.blob.sha256, []).append(image)
+
+        ordered = []
+        for entry in hashed_files:
+            matches = existing.get(entry.digest)
+            ordered.append(matches.pop(0) if matches else entry)
+        kept = [item for item in ordered if isinstance(item, self.model)]
+        post.images.exclude(pk__in=[image.pk for image in kept]).delete()
+        created = iter(self._create_from_hashed(post, [item for item in ordered if not isinstance(item, self.model)]))
+        post_images = [item if isinstance(item, self.model) else next(created) for item in ordered]
+
+        # Keep the order of the upload, kept images are older than the new ones
+        if kept:
+            now = timezone.now()
+            for position, image in enumerate(post_images):
+                image.created_at = now + timedelta(microseconds=position)
+            self.bulk_update(post_images, ['created_at'])
+        return post_images
+
+    def create_from_names(self, post, names):
+        """Insert PostImage rows for files that are already in storage."""
+        return self.insert_rows([self.model(post=post, image=name) for name in names])
+
+    def _create_from_hashed(self, post, hashed_files):
+        if not hashed_files:
+            return []
+        store = ContentAddressedStore(self.model._meta.get_field('image').storage)
+        known, uploaded = ImageBlob.objects.store_missing(store, hashed_files)
+        try:
+            with transaction.atomic():
+                blobs = ImageBlob.objects.add_references(hashed_files, {**known, **uploaded})
+                # Content stored before may already have its variants
+                variants = self.variants_by_blob(blobs.values())
+                post_images = []
+                for hashed in hashed_files:
+                    blob = blobs[hashed.digest]
+                    post_image = self.model(
+                        post=post, blob=blob, image=blob.name, width=hashed.width, height=hashed.height,
+                    )
+                    post_image.set_variants(variants.get(blob.pk, {}))
+                    post_images.append(post_image)
+                self.insert_rows(post_images)
+        except Exception:
+            delete_files(store.storage, list(uploaded.values()))
+            raise
+        # Lost a race against a concurrent upload of the same content
+        delete_files(store.storage, [name for digest, name in uploaded.items() if blobs[digest].name != name])
+        return post_images
+
+    def variants_by_blob(self, blobs):
+        names = {blob.pk: blob.name for blob in blobs}
+        rows = self.filter(blob__in=names).exclude(variants={}).values_list('blob_id', 'variants')
+        return {blob_id: variants for blob_id, variants in rows if variants.get('source') == names[blob_id]}
+
+    def insert_rows(self, post_images):
+        with transaction.atomic():
+            self.bulk_create(post_images)
+        # bulk_create sends no post_save, so the image pipeline is scheduled here
+        for post_image in post_images:
+            if post_image.needs_variants:
+                schedule(post_image, 'image', post_image.variant_stem())
+        return post_images
+
 
 class Post(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='posts')
@@ -15,26 +190,62 @@ class Post(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Maintained on save from the caption and the seller's username
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+            # Typo tolerant caption suggestions (pg_trgm), GiST so it returns the closest first
+            GistIndex(fields=['caption'], name='post_caption_gist_trgm_idx', opclasses=['gist_trgm_ops']),
+            # Price/date filters and keyset pagination with the id tiebreaker
+            models.Index(fields=['price', 'id'], name='post_price_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='post_created_at_id_idx'),
+            models.Index(fields=['user', 'created_at'], name='post_user_created_at_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} - {self.created_at}'
 
+    @property
+    def cover_images(self):
+        # Sliced from the prefetched images when they are loaded
+        return self.images.all()[:1]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'caption' in update_fields:
+            self.search_vector = build_search_vector(self.caption, self.user.username)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_vector'}
+        super().save(*args, **kwargs)
+
 class PostImage(models.Model):
     post = models.ForeignKey(Post, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(
         upload_to=post_image_path,
         storage=get_post_storage()
     )
+    # Shared content, None for images stored before deduplication and for direct uploads
+    blob = models.ForeignKey(ImageBlob, null=True, blank=True, on_delete=models.SET_NULL, related_name='images')
     created_at = models.DateTimeField(default=timezone.now)
+    # Resized WebP copies made by the image pipeline, see core.images
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Displayed size from the upload's header, and a blurred data URI preview from the pipeline
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    placeholder = models.TextField(blank=True, default='', editable=False)
+
+    objects = PostImageQuerySet.as_manager()
 
     class Meta:
-        ordering = ['created_at']
+        ordering = ['created_at', 'id']
 
     def __str__(self):
-        return f'Image for post {self.post.id}'
+        return f'Image for post {self.post_id}'
 
     @property
     def image_url(self):
@@ -44,8 +255,38 @@ class PostImage(models.Model):
 
     @property
     def processed_image_url(self):
-        if not self.image:
-            return None
-        path = str(self.image)
-        base, ext = os.path.splitext(path)
-        return f"images_posts/{self.post.user.id}/{self.post.id}/post-photo-processed{ext}"
+        return variant_url(self.image.storage, self.variants, 'processed')
+
+    @property
+    def thumbnail_url(self):
+        return variant_url(self.image.storage, self.variants, 'thumbnail')
+
+    @property
+    def version(self):
+        return source_version(self.image.name)
+
+    @property
+    def needs_variants(self):
+        return needs_variants(self.image, self.variants)
+
+    def variant_stem(self):
+        return os.path.splitext(self.image.name)[0]
+
+    def set_summary(self, summary):
+        # Manifests from before summaries were added have none, see backfill_image_placeholders
+        self.width = summary.get('width', self.width)
+        self.height = summary.get('height', self.height)
+        self.placeholder = summary.get('placeholder', self.placeholder)
+
+    def set_variants(self, variants):
+        self.variants = variants
+        self.set_summary(variants)
+
+    def store_variants(self, variants):
+        if self.image.name != variants['source']:
+            # Replaced while the pipeline was running, the newer file has its own job
+            return
+        self.set_variants(variants)
+        self.save(update_fields=['variants', 'width', 'height', 'placeholder'])
+        # The variant URLs are part of the post payload, move its validators along
+        Post.objects.filter(pk=self.post_id).update(updated_at=timezone.now())
@@ -0,0 +1,60 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.contrib.auth import get_user_model
+from django.db.models import F, FloatField, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Cast
+
+# Captions are stemmed as English, usernames are matched as-is
+CAPTION_CONFIG = 'english'
+USERNAME_CONFIG = 'simple'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_search_vector(caption, username):
+    """Build the weighted tsvector stored in Post.search_vector."""
+    return (
+        SearchVector(Value(caption, output_field=TextField()), weight='A', config=CAPTION_CONFIG) +
+        SearchVector(Value(username, output_field=TextField()), weight='B', config=USERNAME_CONFIG)
+    )
+
+
+def build_search_query(search):
+    """Turn user input into a prefix tsquery, or None if it has no searchable terms.
+
+    Every term must match and the last one is treated as a prefix, so results
+    update while the user is still typing a word.
+    """
+    terms = TOKEN_RE.findall(search.lower())
+    if not terms:
+        return None
+    # Earlier terms are complete words, only the one being typed matches as a prefix
+    raw = ' & '.join([*terms[:-1], f'{terms[-1]}:*'])
+    return (
+        SearchQuery(raw, search_type='raw', config=CAPTION_CONFIG) |
+        SearchQuery(raw, search_type='raw', config=USERNAME_CONFIG)
+    )
+
+
+def search_posts(queryset, search):
+    """Filter posts matching `search` and annotate them with a relevance `rank`."""
+    query = build_search_query(search)
+    if query is None:
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+    # ts_rank returns a real, cast it so the rank survives a round trip through cursors exactly
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
+
+
+def refresh_search_vectors(queryset):
+    """Recompute search_vector for every post in `queryset` with a single UPDATE."""
+    username = Subquery(
+        get_user_model().objects.filter(pk=OuterRef('user_id')).values('username')[:1]
+    )
+    return queryset.update(
+        search_vector=(
+            SearchVector('caption', weight='A', config=CAPTION_CONFIG) +
+            SearchVector(username, weight='B', config=USERNAME_CONFIG)
+        )
+    )
@@ -1,23 +1,36 @@
+from django.db import transaction
 from rest_framework import serializers
+from core.serializers import AbsoluteURLField, ImageHeaderField, SparseFieldsMixin, UploadRequestSerializer
+from core.uploads import read_uploads
 from .models import Post, PostImage
-from users.serializers import UserSerializer
+from users.serializers import UserSerializer, UserSummarySerializer
 
-class PostImageSerializer(serializers.ModelSerializer):
-    processed_url = serializers.CharField(source='processed_image_url', read_only=True)
+class PostImageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # None until the image pipeline has produced the variant
+    processed_url = AbsoluteURLField(source='processed_image_url')
+    thumbnail_url = AbsoluteURLField()
 
     class Meta:
         model = PostImage
-        fields = ('id', 'image', 'processed_url')
+        # width/height reserve the layout and placeholder is shown until the image loads,
+        # version goes into resize URLs so they can be cached for good
+        fields = ('id', 'image', 'processed_url', 'thumbnail_url', 'width', 'height', 'placeholder', 'version')
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     images = PostImageSerializer(many=True, read_only=True)
     uploaded_images = serializers.ListField(
-        child=serializers.ImageField(max_length=1000000, allow_empty_file=False, use_url=False),
+        child=ImageHeaderField(max_length=1000000, allow_empty_file=False, use_url=False),
         write_only=True,
         required=False
     )
 
+    # Card representation: public seller details and the cover image only
+    compact_fields = {
+        'user': lambda: UserSummarySerializer(read_only=True),
+        'images': lambda: PostImageSerializer(source='cover_images', many=True, read_only=True),
+    }
+
     class Meta:
         model = Post
         fields = ('id', 'user', 'caption', 'price', 'created_at', 'updated_at', 'images', 'uploaded_images')
@@ -25,25 +38,39 @@ class PostSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         uploaded_images = validated_data.pop('uploaded_images', [])
-        post = Post.objects.create(**validated_data)
-
-        for image in uploaded_images:
-            PostImage.objects.create(post=post, image=image)
+        with transaction.atomic():
+            post = Post.objects.create(**validated_data)
+            PostImage.objects.create_from_files(post, uploaded_images)
 
         return post
 
     def update(self, instance, validated_data):
         uploaded_images = validated_data.pop('uploaded_images', [])
         
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        if uploaded_images:
-            # Delete existing images
-            instance.images.all().delete()
-            # Create new images
-            for image in uploaded_images:
-                PostImage.objects.create(post=instance, image=image)
-
-        return instance 
\ No newline at end of file
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            if uploaded_images:
+                # Replace the existing images, unchanged ones are kept as they are
+                PostImage.objects.replace_from_files(instance, uploaded_images)
+
+        return instance 
+
+# Images a post can take in one direct upload round
+MAX_DIRECT_UPLOADS = 10
+
+class PostImageUploadSerializer(serializers.Serializer):
+    files = serializers.ListField(child=UploadRequestSerializer(), min_length=1, max_length=MAX_DIRECT_UPLOADS)
+
+class PostImageConfirmSerializer(serializers.Serializer):
+    uploads = serializers.ListField(child=serializers.CharField(), min_length=1, max_length=MAX_DIRECT_UPLOADS)
+    replace = serializers.BooleanField(default=False)
+
+    def validate_uploads(self, value):
+        storage = PostImage._meta.get_field('image').storage
+        names = read_uploads(value, self.context['request'].user, 'post_image', storage)
+        if PostImage.objects.filter(image__in=names).exists():
+            raise serializers.ValidationError('Upload already confirmed')
+        return names
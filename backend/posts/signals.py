@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core import images
+from .cache import bump_generation
+from .models import ImageBlob, Post, PostImage
+from .search import refresh_search_vectors
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_seller_search_vectors(sender, instance, created, update_fields=None, **kwargs):
+    # Usernames are part of the search vector, keep the seller's posts in sync
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    refresh_search_vectors(Post.objects.filter(user=instance))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=PostImage)
+@receiver(post_delete, sender=PostImage)
+def invalidate_post_cache(sender, **kwargs):
+    # After commit, so a concurrent read can't cache the old rows under the new generation
+    transaction.on_commit(bump_generation)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_post_cache_for_seller(sender, instance, created, update_fields=None, **kwargs):
+    # Sellers are embedded in post payloads, but logins only touch last_login
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    transaction.on_commit(bump_generation)
+
+
+@receiver(post_save, sender=PostImage)
+def generate_post_image_variants(sender, instance, **kwargs):
+    if instance.needs_variants:
+        images.schedule(instance, 'image', instance.variant_stem())
+
+
+@receiver(post_delete, sender=PostImage)
+def release_image_blob(sender, instance, **kwargs):
+    if instance.blob_id is not None:
+        ImageBlob.objects.release([instance.blob_id])
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, FloatField, Func, OuterRef, Value
+from .models import Post
+
+MIN_QUERY_LENGTH = 2
+MAX_CAPTION_LENGTH = 80
+
+
+class WordDistance(Func):
+    """`column <->> query`: 1 - word_similarity(query, column).
+
+    The mirror image of TrigramWordDistance's `query <<-> column`, with the
+    column on the left, the only form a gist_trgm_ops index can order by.
+    """
+    function = ''
+    arg_joiner = ' <->> '
+    output_field = FloatField()
+
+
+def suggest(query, limit):
+    """Top caption and seller matches for a partial, possibly misspelled, query.
+
+    Uses word similarity (`<%`) so a short query matches a word inside a long
+    caption. The trigram GiST indexes return the matches closest first, so a
+    common word stops after `limit` rows instead of sorting every match.
+    """
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return {'captions': [], 'sellers': []}
+
+    captions = (
+        Post.objects.filter(caption__trigram_word_similar=query)
+        .order_by(WordDistance('caption', Value(query)))
+        .values_list('id', 'caption')[:limit]
+    )
+    sellers = (
+        get_user_model().objects.filter(username__trigram_word_similar=query)
+        .filter(Exists(Post.objects.filter(user=OuterRef('pk'))))
+        .order_by(WordDistance('username', Value(query)))
+        .values_list('id', 'username')[:limit]
+    )
+    return {
+        'captions': [{'id': pk, 'caption': caption[:MAX_CAPTION_LENGTH]} for pk, caption in captions],
+        'sellers': [{'id': pk, 'username': username} for pk, username in sellers],
+    }
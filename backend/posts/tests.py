@@ -1,3 +1,189 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from core.derivatives import DerivativeCache, source_version
+from core.testing import NO_CACHE, QueryBudgetMixin
+from users.models import CustomUser
+from .cache import get_generation
+from .models import Post, PostImage
 
-# Create your tests here.
+IMAGES_PER_POST = 3
+
+
+@override_settings(CACHES=NO_CACHE)
+class PostQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query budgets of the post read endpoints, 1 post against 20.
+
+    Each conditional GET runs one aggregate for its ETag/Last-Modified validators first.
+    """
+    client_class = APIClient
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create(username='seller')
+        self.client.force_authenticate(CustomUser.objects.create(username='buyer'))
+        self.post = self.add_posts(1)[0]
+
+    def add_posts(self, count):
+        posts = [
+            Post.objects.create(user=self.seller, caption=f'item {i}', price=Decimal('9.99'))
+            for i in range(count)
+        ]
+        # Image names only, the files themselves are never read while rendering
+        PostImage.objects.bulk_create(
+            PostImage(post=post, image=f'post-{post.id}-{i}.jpg')
+            for post in posts
+            for i in range(IMAGES_PER_POST)
+        )
+        return posts
+
+    def grow(self):
+        self.add_posts(19)
+
+    def test_list(self):
+        self.assertQueryBudget('/api/posts/?page_size=20', 4, self.grow)
+
+    def test_list_cursor(self):
+        self.assertQueryBudget('/api/posts/?pagination=cursor&page_size=20', 3, self.grow)
+
+    def test_search(self):
+        self.assertQueryBudget('/api/posts/?search=item&page_size=20', 4, self.grow)
+
+    def test_detail(self):
+        def grow():
+            PostImage.objects.bulk_create(
+                PostImage(post=self.post, image=f'post-{self.post.id}-extra-{i}.jpg') for i in range(20)
+            )
+        self.assertQueryBudget(f'/api/posts/{self.post.id}/', 3, grow)
+
+
+@override_settings(CACHES=NO_CACHE)
+class PostConditionalGetTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create(username='seller')
+        self.post = Post.objects.create(user=self.seller, caption='item', price=Decimal('9.99'))
+
+    def assertSellerChangeModifies(self, url):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Posts embed their seller, so renaming the seller changes them
+        self.seller.username = 'renamed'
+        self.seller.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list(self):
+        self.assertSellerChangeModifies('/api/posts/')
+
+    def test_detail(self):
+        self.assertSellerChangeModifies(f'/api/posts/{self.post.id}/')
+
+
+class PostFacetsTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        cache.clear()
+        Post.objects.create(user=CustomUser.objects.create(username='seller'), caption='item', price=Decimal('9.99'))
+
+    def test_conditional_and_cached(self):
+        response = self.client.get('/api/posts/facets/')
+        self.assertEqual(response.data['total'], 1)
+        self.assertEqual(self.client.get('/api/posts/facets/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        # Only the validators' aggregate, the facets come from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/posts/facets/').data, response.data)
+
+
+class PostSuggestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('posts.views.suggest', return_value={'captions': [], 'sellers': []})
+    def test_cached_per_normalized_query(self, suggest):
+        self.client.get('/api/posts/suggest/?q=Jack')
+        self.client.get('/api/posts/suggest/?q=jack%20')
+        suggest.assert_called_once_with('Jack', 5)
+        self.client.get('/api/posts/suggest/?q=jack&limit=3')
+        self.assertEqual(suggest.call_count, 2)
+
+
+class DerivativeCacheTests(SimpleTestCase):
+    def test_render_evicted_before_reopen(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DerivativeCache(directory, max_size=1024)
+            write = cache.write
+
+            def write_then_evict(key, content):
+                # Another process evicting it between the write and the reopen
+                write(key, content)
+                os.remove(cache.path(key))
+            cache.write = write_then_evict
+            key = cache.make_key('image.jpg', 320, 'webp')
+            with cache.get_or_render(key, lambda: b'rendered') as file:
+                self.assertEqual(file.read(), b'rendered')
+
+
+class PostImageResizeTests(TestCase):
+    def setUp(self):
+        post = Post.objects.create(user=CustomUser.objects.create(username='seller'), caption='item', price=Decimal('9.99'))
+        self.image = PostImage.objects.bulk_create([PostImage(post=post, image='stored.jpg')])[0]
+        self.url = f'/api/posts/images/{self.image.id}/320.webp'
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Already rendered, so the source file is never opened
+        cache = DerivativeCache(directory.name, max_size=1024)
+        cache.write(cache.make_key('stored.jpg', 320, 'webp'), b'rendered')
+        patcher = mock.patch('posts.views.get_derivative_cache', return_value=cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_redirects_to_current_version(self):
+        current = f'{self.url}?v={source_version("stored.jpg")}'
+        self.assertRedirects(self.client.get(self.url), current, fetch_redirect_response=False)
+        self.assertRedirects(self.client.get(f'{self.url}?v=replaced'), current, fetch_redirect_response=False)
+
+    def test_versioned_is_immutable(self):
+        response = self.client.get(self.url, {'v': self.image.version})
+        self.assertEqual(b''.join(response.streaming_content), b'rendered')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_serialized_version(self):
+        response = self.client.get(f'/api/posts/{self.image.post_id}/')
+        self.assertEqual(response.data['images'][0]['version'], source_version('stored.jpg'))
+
+
+class BackfillImagePlaceholdersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        post = Post.objects.create(user=CustomUser.objects.create(username='seller'), caption='item', price=Decimal('9.99'))
+        # bulk_create, so the image pipeline isn't scheduled
+        PostImage.objects.bulk_create([PostImage(post=post, image='stored.jpg')])
+
+    @mock.patch('core.images.run_summary_job', return_value={'width': 4, 'height': 3, 'placeholder': 'data:,'})
+    @mock.patch('core.images.get_executor', lambda: ThreadPoolExecutor(max_workers=1))
+    def test_invalidates_cached_posts(self, run_summary_job):
+        generation = get_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('backfill_image_placeholders', stdout=io.StringIO())
+        self.assertEqual(PostImage.objects.get().placeholder, 'data:,')
+        self.assertNotEqual(get_generation(), generation)
+
+    @mock.patch('core.images.run_summary_job', return_value={'width': 4, 'height': 3, 'placeholder': 'data:,'})
+    @mock.patch('core.images.get_executor', lambda: ThreadPoolExecutor(max_workers=1))
+    def test_invalidates_cached_posts_from_another_process(self, run_summary_job):
+        url = f'/api/posts/{Post.objects.get().id}/'
+        self.assertEqual(self.client.get(url).data['images'][0]['placeholder'], '')
+        # A command's generation bump only reaches its own LocMemCache
+        with mock.patch('posts.management.commands.backfill_image_placeholders.bump_generation'):
+            call_command('backfill_image_placeholders', stdout=io.StringIO())
+        self.assertEqual(self.client.get(url).data['images'][0]['placeholder'], 'data:,')
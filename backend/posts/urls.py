@@ -5,8 +5,13 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.PostListView.as_view(), name='post-list'),
+    path('facets/', views.PostFacetsView.as_view(), name='post-facets'),
+    path('suggest/', views.PostSuggestView.as_view(), name='post-suggest'),
     path('<int:pk>/', views.PostDetailView.as_view(), name='post-detail'),
     path('create/', views.PostCreateView.as_view(), name='post-create'),
     path('<int:pk>/edit/', views.PostUpdateView.as_view(), name='post-update'),
     path('<int:pk>/delete/', views.PostDeleteView.as_view(), name='post-delete'),
+    path('uploads/', views.PostImageUploadView.as_view(), name='post-image-upload'),
+    path('<int:pk>/images/confirm/', views.PostImageConfirmView.as_view(), name='post-image-confirm'),
+    path('images/<int:pk>/<int:width>.<str:extension>', views.PostImageResizeView.as_view(), name='post-image-resize'),
 ] 
\ No newline at end of file
@@ -1,11 +1,28 @@
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, HttpResponseNotModified, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views import View
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q
-from .models import Post
-from .serializers import PostSerializer
+from rest_framework.renderers import BrowsableAPIRenderer
+from core.conditional import ConditionalGetMixin
+from core.derivatives import get_derivative_cache, source_version
+from core.fastpath import use_fast_read_path
+from core.images import DERIVATIVE_FORMATS, render_derivative
+from core.pagination import KeysetPagination
+from core.renderers import FastJSONRenderer
+from core.uploads import issue_upload, unique_upload_name
+from .cache import CachedResponseMixin, normalize_list_params
+from .fastpath import PostCardRenderer, post_card_rows
+from .models import Post, PostImage
+from .filters import filter_posts, get_facets
+from .serializers import PostImageConfirmSerializer, PostImageUploadSerializer, PostSerializer
+from .suggest import suggest
 
 # Create your views here.
 
@@ -14,39 +31,108 @@ class PostPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class PostListView(generics.ListAPIView):
+class PostCursorPagination(KeysetPagination):
+    page_size = 9
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class PostListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     pagination_class = PostPagination
+    cursor_pagination_class = PostCursorPagination
+    cache_prefix = 'list'
+    # Posts embed their seller
+    last_modified_fields = ('updated_at', 'user__updated_at')
+
+    def get_cache_params(self, request, *args, **kwargs):
+        return normalize_list_params(request.query_params)
+
+    def get_serializer_context(self):
+        # Feed cards by default, ?expand= restores the full nested fields
+        return {**super().get_serializer_context(), 'compact': True}
+
+    @property
+    def paginator(self):
+        # Page numbers stay the default, ?pagination=cursor or a cursor switches to keyset mode
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_queryset(self):
-        queryset = Post.objects.all()
+        # Handle search and filters
+        queryset = filter_posts(Post.objects.with_related(), self.request.query_params)
+        search = self.request.query_params.get('search', '').strip()
         
-        # Handle search
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(caption__icontains=search) |
-                Q(user__username__icontains=search)
-            )
-        
-        # Handle sorting
+        # Handle sorting, matches are ranked by relevance within equal sort keys
         sort = self.request.query_params.get('sort', '-created_at')
         if sort == 'created_at':  # Date A-Z
-            queryset = queryset.order_by('created_at')
-        elif sort == '-created_at':  # Date Z-A (default)
-            queryset = queryset.order_by('-created_at')
+            ordering = ['created_at']
         elif sort == 'price':  # Price A-Z
-            queryset = queryset.order_by('price')
+            ordering = ['price']
         elif sort == '-price':  # Price Z-A
-            queryset = queryset.order_by('-price')
-        
-        return queryset
+            ordering = ['-price']
+        elif sort == 'relevance' and search:  # Best match first
+            ordering = ['-rank', '-created_at']
+        else:  # Date Z-A (default)
+            ordering = ['-created_at']
 
-class PostDetailView(generics.RetrieveAPIView):
-    queryset = Post.objects.all()
+        if search and sort != 'relevance':
+            ordering.append('-rank')
+        return queryset.order_by(*ordering)
+
+    def list(self, request, *args, **kwargs):
+        if not use_fast_read_path(request):
+            return super().list(request, *args, **kwargs)
+        # Same payload as the serializers, rendered from value rows
+        rows = self.paginate_queryset(post_card_rows(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(PostCardRenderer(request).render(rows))
+
+class PostFacetsView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    cache_prefix = 'facets'
+    # Top sellers are listed by username
+    last_modified_fields = ('updated_at', 'user__updated_at')
+
+    def get_cache_params(self, request, *args, **kwargs):
+        return normalize_list_params(request.query_params)
+
+    def get_queryset(self):
+        return filter_posts(Post.objects.all(), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        return Response(get_facets(self.filter_queryset(self.get_queryset())))
+
+class PostSuggestView(CachedResponseMixin, generics.ListAPIView):
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    cache_prefix = 'suggest'
+    default_limit = 5
+    max_limit = 10
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def get_cache_params(self, request, *args, **kwargs):
+        return {'q': request.query_params.get('q', '').strip().lower(), 'limit': self.get_limit(request)}
+
+    def list(self, request, *args, **kwargs):
+        return Response(suggest(request.query_params.get('q', ''), self.get_limit(request)))
+
+class PostDetailView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
+    queryset = Post.objects.with_related()
     serializer_class = PostSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    cache_prefix = 'detail'
+    last_modified_fields = ('updated_at', 'user__updated_at')
 
 class PostCreateView(generics.CreateAPIView):
     queryset = Post.objects.all()
@@ -71,3 +157,83 @@ class PostDeleteView(generics.DestroyAPIView):
 
     def get_queryset(self):
         return Post.objects.filter(user=self.request.user)
+
+class PostImageUploadView(APIView):
+    """Phase one of a direct upload: storage targets the client sends image bytes to."""
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        serializer = PostImageUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        storage = PostImage._meta.get_field('image').storage
+        uploads = [
+            issue_upload(
+                request, storage, unique_upload_name('post-upload', file['content_type']),
+                file['content_type'], 'post_image',
+            )
+            for file in serializer.validated_data['files']
+        ]
+        return Response({'uploads': uploads}, status=status.HTTP_201_CREATED)
+
+class PostImageConfirmView(generics.GenericAPIView):
+    """Phase two: attach uploaded objects to one of the user's posts."""
+    serializer_class = PostImageConfirmSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return Post.objects.filter(user=self.request.user)
+
+    def post(self, request, *args, **kwargs):
+        post = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            if serializer.validated_data['replace']:
+                post.images.all().delete()
+            PostImage.objects.create_from_names(post, serializer.validated_data['uploads'])
+            # Moves the post's validators and invalidates cached payloads
+            post.save(update_fields=['updated_at'])
+        post = Post.objects.with_related().get(pk=post.pk)
+        return Response(PostSerializer(post, context=self.get_serializer_context()).data)
+
+class PostImageResizeView(View):
+    """A post image resized to one of IMAGE_RESIZE_WIDTHS, rendered once and served from the disk cache.
+
+    A plain Django view: <img> requests carry no credentials and arbitrary
+    Accept headers, and the response is the file itself.
+    """
+    def get(self, request, pk, width, extension):
+        if extension not in DERIVATIVE_FORMATS:
+            return JsonResponse({'error': f'Unsupported format: {extension}'}, status=400)
+        if width not in settings.IMAGE_RESIZE_WIDTHS:
+            return JsonResponse({'error': f'Width must be one of {list(settings.IMAGE_RESIZE_WIDTHS)}'}, status=400)
+        name = PostImage.objects.filter(pk=pk).values_list('image', flat=True).first()
+        if not name:
+            return JsonResponse({'error': 'Image not found'}, status=404)
+        version = source_version(name)
+        if request.GET.get('v') != version:
+            # Unversioned or for a replaced image, send it to the URL of the current one
+            return HttpResponseRedirect(f'{request.path}?v={version}')
+
+        cache = get_derivative_cache()
+        # Keyed by the stored name, identical content shares one derivative across posts
+        key = cache.make_key(name, width, extension)
+        etag = f'"{key[:32]}"'
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponseNotModified(headers={'ETag': etag})
+
+        storage = PostImage._meta.get_field('image').storage
+
+        def render_image():
+            with storage.open(name, 'rb') as source:
+                return render_derivative(source, width, extension)
+
+        try:
+            file = cache.get_or_render(key, render_image)
+        except (ValueError, FileNotFoundError):
+            return JsonResponse({'error': 'Image could not be resized'}, status=404)
+        response = FileResponse(file, content_type=DERIVATIVE_FORMATS[extension][1])
+        response['ETag'] = etag
+        # The URL carries the stored image's version, so its content never changes
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+        return response
@@ -0,0 +1,82 @@
+"""Round trips of adding to the cart, read-modify-write versus a single upsert.
+
+Builds fixtures in a throwaway test database, then counts the queries of
+one add for each flow and times a run of sequential adds. The read-modify-
+write flow is what AddToCartView did before. That concurrent adds lose no
+increment is covered by orders.tests.AddToCartConcurrencyTests.
+
+    python scripts/benchmark_add_to_cart.py --adds 300
+"""
+import argparse
+import os
+import sys
+import time
+import django
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from decimal import Decimal
+from django.db import connection
+from django.shortcuts import get_object_or_404
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from users.models import CustomUser
+from posts.models import Post
+from orders.models import Cart, CartItem
+
+
+def add_read_modify_write(user, post_id, quantity):
+    # What AddToCartView did before
+    post = get_object_or_404(Post, id=post_id)
+    cart, _ = Cart.objects.get_or_create(user=user)
+    cart_item, created = CartItem.objects.get_or_create(cart=cart, post=post, defaults={'quantity': quantity})
+    if not created:
+        cart_item.quantity += quantity
+        cart_item.save()
+
+
+def add_upsert(user, post_id, quantity):
+    Cart.objects.add_item(user, post_id, quantity)
+
+
+def run_sequentially(add, user, post_id, adds):
+    start = time.perf_counter()
+    for _ in range(adds):
+        add(user, post_id, 1)
+    elapsed = time.perf_counter() - start
+    return CartItem.objects.get(cart__user=user, post_id=post_id).quantity, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--adds', type=int, default=300)
+    args = parser.parse_args()
+
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        seller = CustomUser.objects.create(username='cart_bench_seller')
+        post = Post.objects.create(user=seller, caption='cart bench', price=Decimal('10'))
+
+        print(f"{'flow':<22}{'first add':>10}{'next adds':>10}{'quantity':>10}{'ms/add':>8}")
+        for name, add in (('read-modify-write', add_read_modify_write), ('upsert', add_upsert)):
+            user = CustomUser.objects.create(username=f'cart_bench_{name}')
+            # The first add creates the cart and the item, the next ones are the steady state
+            with CaptureQueriesContext(connection) as first:
+                add(user, post.id, 1)
+            with CaptureQueriesContext(connection) as steady:
+                add(user, post.id, 1)
+            quantity, elapsed = run_sequentially(add, user, post.id, args.adds)
+            print(f'{name:<22}{len(first.captured_queries):>10}{len(steady.captured_queries):>10}'
+                  f'{quantity:>10}{elapsed * 1000 / args.adds:>8.2f}')
+    finally:
+        connection.close()
+        runner.teardown_databases(old_config)
+
+if __name__ == '__main__':
+    main()
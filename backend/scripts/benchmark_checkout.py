@@ -0,0 +1,108 @@
+"""Latency and queries of checkout as the cart grows, per-line queries versus the bulk transaction.
+
+Builds fixtures in a throwaway test database, fills the buyer's cart with
+1 to 200 lines and times OrderCreateSerializer.save() against the flow it
+replaced: an exists() check, a lazy post fetch per line for the total, an
+INSERT and another post fetch per order item, and a signal per deleted line.
+Rendering the created order is left out, it grows with the order either way.
+
+    python scripts/benchmark_checkout.py --rounds 5
+"""
+import argparse
+import os
+import sys
+import time
+import django
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from decimal import Decimal
+from django.db import connection
+from django.test import RequestFactory
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from users.models import CustomUser
+from posts.models import Post
+from orders.models import Cart, CartItem, Order, OrderItem
+from orders.serializers import OrderCreateSerializer
+
+CART_SIZES = (1, 10, 50, 200)
+ORDER_DATA = {'payment_method': 'bank', 'shipping_address': 'Street 1', 'contact_info': {'email': 'b@example.com'}}
+
+
+def checkout_per_line(user, data):
+    # What OrderCreateSerializer.create did before
+    cart = user.cart
+    if not cart or not cart.items.exists():
+        raise ValueError('Cart is empty')
+    data = dict(data)
+    contact_info = data.pop('contact_info', {})
+    total_amount = sum(item.post.price * item.quantity for item in cart.items.all())
+    order = Order.objects.create(user=user, total_amount=total_amount, contact_info=contact_info, **data)
+    for cart_item in cart.items.all():
+        OrderItem.objects.create(
+            order=order, post=cart_item.post, quantity=cart_item.quantity, price=cart_item.post.price
+        )
+    cart.items.all().delete()
+    return order
+
+
+def checkout_bulk(user, data):
+    request = RequestFactory().post('/api/orders/create/')
+    request.user = user
+    serializer = OrderCreateSerializer(data=data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+def fill_cart(cart, posts):
+    CartItem.objects.bulk_create(CartItem(cart=cart, post=post, quantity=2) for post in posts)
+
+
+def measure(checkout, user, cart, posts, rounds):
+    timings = []
+    queries = 0
+    for _ in range(rounds):
+        fill_cart(cart, posts)
+        # Fresh instance, nothing cached from the previous round
+        user = CustomUser.objects.get(pk=user.pk)
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            order = checkout(user, ORDER_DATA)
+            timings.append(time.perf_counter() - start)
+        queries = len(context.captured_queries)
+        assert order.items.count() == len(posts) and not cart.items.exists()
+    return sorted(timings)[len(timings) // 2], queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        seller = CustomUser.objects.create(username='checkout_bench_seller')
+        posts = Post.objects.bulk_create(
+            Post(user=seller, caption=f'item {i}', price=Decimal('9.99')) for i in range(max(CART_SIZES))
+        )
+        buyer = CustomUser.objects.create(username='checkout_bench_buyer')
+        cart = Cart.objects.create(user=buyer)
+
+        print(f"{'lines':<7}{'per line':>10}{'queries':>9}{'bulk':>10}{'queries':>9}")
+        for size in CART_SIZES:
+            old_time, old_queries = measure(checkout_per_line, buyer, cart, posts[:size], args.rounds)
+            new_time, new_queries = measure(checkout_bulk, buyer, cart, posts[:size], args.rounds)
+            print(f'{size:<7}{old_time * 1000:>8.1f}ms{old_queries:>9}{new_time * 1000:>8.1f}ms{new_queries:>9}')
+    finally:
+        runner.teardown_databases(old_config)
+
+
+if __name__ == '__main__':
+    main()
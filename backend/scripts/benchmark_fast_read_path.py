@@ -0,0 +1,102 @@
+"""Requests/sec of the serializer and fast read paths for the list endpoints.
+
+Builds fixtures in a throwaway test database, checks that both paths render
+byte-for-byte identical responses, then times each path in-process.
+
+    python scripts/benchmark_fast_read_path.py --posts 100 --requests 200
+"""
+import argparse
+import os
+import sys
+import time
+import django
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from decimal import Decimal
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from users.models import CustomUser
+from posts.models import Post, PostImage
+from orders.models import Order, OrderItem
+
+ENDPOINTS = {
+    'post list': '/api/posts/?page_size=100',
+    'post search': '/api/posts/?search=item&sort=-price&page_size=100',
+    'post list (cursor)': '/api/posts/?pagination=cursor&sort=price&page_size=100',
+    'order list': '/api/orders/',
+}
+
+
+def build_fixtures(post_count):
+    seller = CustomUser.objects.create(username='bench_seller', profile_photo='profile-photo.jpg')
+    buyer = CustomUser.objects.create(username='bench_buyer')
+    posts = Post.objects.bulk_create(
+        Post(user=seller, caption=f'item {i} café  ', price=Decimal(i % 50) + Decimal('0.5'))
+        for i in range(post_count)
+    )
+    PostImage.objects.bulk_create(
+        PostImage(post=post, image=f'post-{post.id}-{i}.jpg') for post in posts for i in range(3)
+    )
+    for start in range(0, min(post_count, 90), 10):
+        order = Order.objects.create(
+            user=buyer, payment_method='bank', total_amount=Decimal('12.30'),
+            shipping_address='Street 1', contact_info={'email': 'buyer@example.com'},
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, post=post, quantity=2, price=post.price)
+            for post in posts[start:start + 10]
+        )
+    OrderItem.objects.create(order=order, post=None, quantity=1, price=Decimal('1'))
+    return buyer
+
+
+def fetch(client, url, fast):
+    with override_settings(FAST_READ_PATH=fast):
+        return client.get(url, HTTP_ACCEPT='application/json')
+
+
+def requests_per_second(client, url, fast, count):
+    with override_settings(FAST_READ_PATH=fast):
+        start = time.perf_counter()
+        for _ in range(count):
+            client.get(url, HTTP_ACCEPT='application/json')
+        return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    mismatches = 0
+    try:
+        # Every request has to render, not come from the response cache
+        no_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(ALLOWED_HOSTS=['testserver'], CACHES=no_cache):
+            client = APIClient()
+            client.force_authenticate(build_fixtures(args.posts))
+            print(f"{'endpoint':<20}{'identical':>10}{'serializer rps':>16}{'fast rps':>10}{'speedup':>9}")
+            for name, url in ENDPOINTS.items():
+                slow_response, fast_response = fetch(client, url, False), fetch(client, url, True)
+                identical = slow_response.content == fast_response.content
+                mismatches += not identical
+                slow = requests_per_second(client, url, False, args.requests)
+                fast = requests_per_second(client, url, True, args.requests)
+                print(f"{name:<20}{'yes' if identical else 'NO':>10}{slow:>16.1f}{fast:>10.1f}{fast / slow:>8.1f}x")
+    finally:
+        runner.teardown_databases(old_config)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
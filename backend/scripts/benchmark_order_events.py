@@ -0,0 +1,100 @@
+"""Events/sec of order transitions into the outbox and of dispatching it to the sinks.
+
+Builds fixtures in a throwaway test database, moves every order from
+pending to processing (one transaction, one outbox event each), then
+drains the outbox with one and with several dispatchers side by side, into
+the in-process queue sink and into the file sink. Every event has to be
+delivered exactly once per run, SKIP LOCKED keeps the dispatchers apart.
+
+    python scripts/benchmark_order_events.py --orders 2000 --batch-size 100 --dispatchers 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import django
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from users.models import CustomUser
+from orders.events import FileSink, QueueSink, dispatch_batch
+from orders.models import Order, OrderEvent
+
+
+def drain(sink, batch_size, dispatchers):
+    def work(_):
+        delivered = 0
+        try:
+            while count := dispatch_batch([sink], batch_size):
+                delivered += count
+            return delivered
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=dispatchers) as executor:
+        delivered = sum(executor.map(work, range(dispatchers)))
+    return delivered, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--dispatchers', type=int, default=4)
+    args = parser.parse_args()
+
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    ok = True
+    try:
+        buyer = CustomUser.objects.create(username='events_bench_buyer')
+        orders = Order.objects.bulk_create(
+            Order(user=buyer, payment_method='bank', total_amount=Decimal('10'), shipping_address='Street 1')
+            for _ in range(args.orders)
+        )
+
+        start = time.perf_counter()
+        for order in orders:
+            order.transition('processing')
+        elapsed = time.perf_counter() - start
+        events = OrderEvent.objects.count()
+        print(f'transitions   {events} events in {elapsed:.2f}s, {events / elapsed:.0f} events/s')
+
+        print(f"{'sink':<8}{'dispatchers':>12}{'delivered':>11}{'seconds':>9}{'events/s':>10}{'dupes':>7}")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            for name, sink in (('queue', QueueSink()), ('file', FileSink(path))):
+                for dispatchers in sorted({1, args.dispatchers}):
+                    OrderEvent.objects.update(dispatched_at=None, attempts=0)
+                    if os.path.exists(path):
+                        os.remove(path)
+                    delivered, elapsed = drain(sink, args.batch_size, dispatchers)
+                    if name == 'queue':
+                        ids = Counter(sink.queue.get()['id'] for _ in range(sink.queue.qsize()))
+                    else:
+                        with open(path, encoding='utf-8') as file:
+                            ids = Counter(json.loads(line)['id'] for line in file)
+                    dupes = sum(count - 1 for count in ids.values())
+                    ok = ok and delivered == events and len(ids) == events and not dupes
+                    print(f'{name:<8}{dispatchers:>12}{delivered:>11}{elapsed:>9.2f}{delivered / elapsed:>10.0f}{dupes:>7}')
+    finally:
+        connection.close()
+        runner.teardown_databases(old_config)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
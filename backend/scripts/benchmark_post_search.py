@@ -0,0 +1,107 @@
+"""Compare the legacy icontains search against the full-text search backend.
+
+Seeds synthetic posts (1M by default) in a throwaway test database, then
+times the first page of each search path for a handful of terms.
+
+    python scripts/benchmark_post_search.py --posts 1000000 --runs 5
+"""
+import argparse
+import os
+import sys
+import time
+import django
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Q
+from django.test.runner import DiscoverRunner
+from users.models import CustomUser
+from posts.models import Post
+from posts.search import search_posts
+
+BENCH_USERNAME = 'bench_search_seller'
+WORDS = ['vintage', 'leather', 'jacket', 'running', 'shoes', 'wooden', 'table', 'camera',
+         'lens', 'guitar', 'bicycle', 'lamp', 'ceramic', 'vase', 'wool', 'scarf']
+TERMS = ['jacket', 'vint', 'running shoes', 'ceramic vase', 'nomatch']
+PAGE_SIZE = 9
+
+
+def seed(count):
+    seller = CustomUser.objects.create(username=BENCH_USERNAME)
+    words = '{' + ','.join(WORDS) + '}'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO posts_post (user_id, caption, price, created_at, updated_at)
+            SELECT %s,
+                   (%s::text[])[1 + i %% 16] || ' ' || (%s::text[])[1 + (i / 16) %% 16] || ' #' || i,
+                   (i %% 10000) / 100.0,
+                   now() - i * interval '1 second',
+                   now()
+            FROM generate_series(1, %s) AS i
+            """,
+            [seller.id, words, words, count],
+        )
+        cursor.execute(
+            """
+            UPDATE posts_post
+            SET search_vector = setweight(to_tsvector('english', caption), 'A') ||
+                                setweight(to_tsvector('simple', %s), 'B')
+            WHERE user_id = %s
+            """,
+            [BENCH_USERNAME, seller.id],
+        )
+        cursor.execute('ANALYZE posts_post')
+    return seller
+
+
+def legacy_search(term):
+    return Post.objects.filter(
+        Q(caption__icontains=term) | Q(user__username__icontains=term)
+    ).order_by('-created_at')
+
+
+def fulltext_search(term):
+    return search_posts(Post.objects.all(), term).order_by('-created_at', '-rank')
+
+
+def timed(build, term, runs):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        queryset = build(term)
+        queryset.count()
+        list(queryset[:PAGE_SIZE])
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        print(f"Seeding {args.posts} posts...")
+        seed(args.posts)
+        print(f"{'term':<16}{'icontains ms':>14}{'full-text ms':>14}{'speedup':>10}")
+        for term in TERMS:
+            legacy = timed(legacy_search, term, args.runs)
+            fulltext = timed(fulltext_search, term, args.runs)
+            print(f"{term:<16}{legacy:>14.1f}{fulltext:>14.1f}{legacy / fulltext:>9.1f}x")
+    finally:
+        connection.close()
+        runner.teardown_databases(old_config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Latency check for the /api/posts/suggest/ trigram autocomplete.
+
+Seeds synthetic posts (1M by default) in a throwaway test database and
+measures suggest() for a set of partial and misspelled queries against the
+10 ms budget. Exits non-zero if the p95 of any query is over budget.
+
+    python scripts/benchmark_post_suggest.py --posts 1000000 --runs 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import django
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from users.models import CustomUser
+from posts.suggest import suggest
+
+BENCH_USERNAME = 'bench_suggest_seller'
+WORDS = ['vintage', 'leather', 'jacket', 'running', 'shoes', 'wooden', 'table', 'camera',
+         'lens', 'guitar', 'bicycle', 'lamp', 'ceramic', 'vase', 'wool', 'scarf']
+QUERIES = ['jack', 'jakcet', 'vintag', 'guitr', 'ceramic va', 'bench_sug', 'zzzz']
+BUDGET_MS = 10.0
+
+
+def seed(count):
+    seller = CustomUser.objects.create(username=BENCH_USERNAME)
+    words = '{' + ','.join(WORDS) + '}'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO posts_post (user_id, caption, price, created_at, updated_at)
+            SELECT %s,
+                   (%s::text[])[1 + i %% 16] || ' ' || (%s::text[])[1 + (i / 16) %% 16] || ' #' || i,
+                   (i %% 10000) / 100.0,
+                   now() - i * interval '1 second',
+                   now()
+            FROM generate_series(1, %s) AS i
+            """,
+            [seller.id, words, words, count],
+        )
+        cursor.execute('ANALYZE posts_post')
+    return seller
+
+
+def measure(query, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        suggest(query, 5)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[max(0, int(len(timings) * 0.95) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    over_budget = 0
+    try:
+        print(f"Seeding {args.posts} posts...")
+        seed(args.posts)
+        print(f"{'query':<14}{'p50 ms':>9}{'p95 ms':>9}")
+        for query in QUERIES:
+            p50, p95 = measure(query, args.runs)
+            over_budget += p95 > BUDGET_MS
+            print(f"{query:<14}{p50:>9.2f}{p95:>9.2f}  {'ok' if p95 <= BUDGET_MS else 'OVER BUDGET'}")
+    finally:
+        connection.close()
+        runner.teardown_databases(old_config)
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
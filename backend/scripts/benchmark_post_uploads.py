@@ -0,0 +1,137 @@
+"""Latency of storing a post's images one by one versus concurrently in bulk.
+
+Uses a FileSystemStorage in a temporary directory that sleeps on every write
+and delete, standing in for S3 round trips, and a throwaway test database.
+Also checks that a failed upload leaves neither files nor rows behind.
+
+    python scripts/benchmark_post_uploads.py --latency 0.08 --rounds 5
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import django
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from decimal import Decimal
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test.runner import DiscoverRunner
+from PIL import Image
+from users.models import CustomUser
+from posts.models import Post, PostImage
+
+IMAGE_COUNTS = (1, 5, 10)
+
+
+class SlowStorage(FileSystemStorage):
+    """Local storage with a fixed delay per write and delete, like a remote object store."""
+    def __init__(self, latency, fail_after=None, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.fail_after = fail_after
+        self.saves = 0
+        self.lock = threading.Lock()
+
+    def _save(self, name, content):
+        with self.lock:
+            self.saves += 1
+            failing = self.fail_after is not None and self.saves > self.fail_after
+        time.sleep(self.latency)
+        if failing:
+            raise OSError('simulated upload failure')
+        return super()._save(name, content)
+
+    def delete(self, name):
+        time.sleep(self.latency)
+        super().delete(name)
+
+
+def make_files(count):
+    # Distinct content per file, identical bytes would be deduplicated into one upload
+    files = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), tuple(os.urandom(3))).save(buffer, 'JPEG')
+        files.append(SimpleUploadedFile(f'photo-{i}.jpg', buffer.getvalue(), content_type='image/jpeg'))
+    return files
+
+
+def create_one_by_one(post, files):
+    # What PostSerializer did before: a blocking storage write and an INSERT per image
+    for file in files:
+        PostImage.objects.create(post=post, image=file)
+
+
+def time_create(create, post, count, rounds):
+    timings = []
+    for _ in range(rounds):
+        files = make_files(count)
+        # Rolled back, so the image pipeline never gets scheduled
+        with transaction.atomic():
+            start = time.perf_counter()
+            create(post, files)
+            timings.append(time.perf_counter() - start)
+            transaction.set_rollback(True)
+    return sorted(timings)[len(timings) // 2]
+
+
+def stored_files(location):
+    return {os.path.join(root, name) for root, _, names in os.walk(location) for name in names}
+
+
+def check_rollback(field, post, latency, location):
+    field.storage = SlowStorage(latency, fail_after=3, location=location)
+    before = stored_files(location)
+    try:
+        with transaction.atomic():
+            PostImage.objects.create_from_files(post, make_files(6))
+    except OSError:
+        pass
+    leftover = stored_files(location) - before
+    rows = PostImage.objects.filter(post=post).count()
+    print(f'failed upload: {len(leftover)} files left, {rows} rows left')
+    return not leftover and not rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.08, help='seconds per storage write')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    field = PostImage._meta.get_field('image')
+    original_storage = field.storage
+    try:
+        with tempfile.TemporaryDirectory() as location:
+            field.storage = SlowStorage(args.latency, location=location)
+            seller = CustomUser.objects.create(username='upload_bench_seller')
+            post = Post.objects.create(user=seller, caption='upload bench', price=Decimal('10'))
+
+            print(f"{'images':<8}{'one by one':>12}{'concurrent':>12}{'speedup':>9}")
+            for count in IMAGE_COUNTS:
+                sequential = time_create(create_one_by_one, post, count, args.rounds)
+                concurrent = time_create(PostImage.objects.create_from_files, post, count, args.rounds)
+                print(f'{count:<8}{sequential * 1000:>10.0f}ms{concurrent * 1000:>10.0f}ms'
+                      f'{sequential / concurrent:>8.1f}x')
+            ok = check_rollback(field, post, args.latency, location)
+    finally:
+        field.storage = original_storage
+        runner.teardown_databases(old_config)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
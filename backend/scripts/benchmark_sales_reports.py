@@ -0,0 +1,191 @@
+"""Sales reports from the rollups against aggregating the order history.
+
+Builds fixtures in a throwaway test database: orders from before the outbox,
+then orders created through the outbox, some of them cancelled later. The
+outbox is drained into the rollup sink by several dispatchers side by side,
+and the rollups have to come out exactly as rebuild_sales_rollups computes
+them. Then each report is timed read from its rollup and aggregated from
+the orders.
+
+    python scripts/benchmark_sales_reports.py --orders 5000 --lines 3 --posts 500 --dispatchers 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import django
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.test.runner import DiscoverRunner
+from django.utils import timezone
+from users.models import CustomUser
+from posts.models import Post
+from orders.events import dispatch_batch
+from orders.models import DailySales, Order, OrderEvent, OrderItem, PostSales, SellerSales
+from orders.rollups import SalesRollupSink, counted_orders, rebuild
+
+REVENUE = Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def snapshot():
+    # Rows cancelled down to zero only disappear with a rebuild
+    return (
+        set(DailySales.objects.exclude(order_count=0).values_list('date', 'order_count', 'revenue')),
+        set(PostSales.objects.exclude(units_sold=0).values_list('post_id', 'seller_id', 'units_sold', 'revenue')),
+        set(SellerSales.objects.exclude(units_sold=0).values_list('seller_id', 'units_sold', 'revenue')),
+    )
+
+
+def drain(batch_size, dispatchers):
+    def work(_):
+        try:
+            delivered = 0
+            while count := dispatch_batch([SalesRollupSink()], batch_size):
+                delivered += count
+            return delivered
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=dispatchers) as executor:
+        return sum(executor.map(work, range(dispatchers)))
+
+
+def best_of(runs, read):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        read()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def build_orders(buyer, posts, count, lines, days):
+    now = timezone.now()
+    orders = Order.objects.bulk_create(
+        Order(user=buyer, payment_method='bank', total_amount=Decimal('0'), shipping_address='Street 1')
+        for _ in range(count)
+    )
+    items = []
+    for order in orders:
+        for post in random.sample(posts, lines):
+            items.append(OrderItem(
+                order=order, post=post, seller_id=post.user_id, quantity=random.randint(1, 3), price=post.price
+            ))
+            order.total_amount += items[-1].quantity * post.price
+        order.created_at = now - timedelta(days=random.randrange(days))
+    OrderItem.objects.bulk_create(items)
+    Order.objects.bulk_update(orders, ['total_amount', 'created_at'])
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--lines', type=int, default=3)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--sellers', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--dispatchers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    ok = True
+    try:
+        buyer = CustomUser.objects.create(username='sales_bench_buyer')
+        sellers = CustomUser.objects.bulk_create(
+            CustomUser(username=f'sales_bench_seller{i}') for i in range(args.sellers)
+        )
+        posts = Post.objects.bulk_create(
+            Post(user=sellers[i % len(sellers)], caption=f'item {i}', price=Decimal(random.randint(100, 10000)) / 100)
+            for i in range(args.posts)
+        )
+
+        # A quarter from before the outbox, some of those cancelled without an event
+        legacy = build_orders(buyer, posts, args.orders // 4, args.lines, args.days)
+        for order in legacy[::10]:
+            order.status = 'cancelled'
+        Order.objects.bulk_update(legacy[::10], ['status'])
+        start = time.perf_counter()
+        written = rebuild()
+        print(f'backfill      {len(legacy)} orders in {time.perf_counter() - start:.2f}s, '
+              f'{", ".join(f"{count} {model._meta.verbose_name_plural}" for model, count in written.items())}')
+
+        orders = build_orders(buyer, posts, args.orders - len(legacy), args.lines, args.days)
+        for order in orders:
+            order.record_event('order.created')
+        start = time.perf_counter()
+        delivered = drain(args.batch_size, args.dispatchers)
+        print(f'created       {delivered} events in {time.perf_counter() - start:.2f}s')
+
+        # Cancel a tenth of all orders, and leave some cancellations in the outbox for rebuild to skip
+        for order in random.sample(legacy + orders, args.orders // 10):
+            if order.status != 'cancelled':
+                order.transition('cancelled')
+        start = time.perf_counter()
+        delivered = drain(args.batch_size, args.dispatchers)
+        print(f'cancelled     {delivered} events in {time.perf_counter() - start:.2f}s')
+        for order in random.sample(orders, 20):
+            if order.status == 'pending':
+                order.transition('cancelled')
+
+        incremental = snapshot()
+        rebuild()
+        consistent = incremental == snapshot()
+        ok = ok and consistent
+        print(f"rollups       {'match' if consistent else 'DO NOT match'} a rebuild, "
+              f'{OrderEvent.objects.pending().count()} events still pending')
+
+        # Each report read from its rollup and aggregated from the orders, one page of the largest
+        seller = sellers[0]
+        reports = {
+            'daily': (
+                lambda: list(DailySales.objects.order_by('date')[:366]),
+                lambda: list(counted_orders().order_by().values(day=TruncDate('created_at'))
+                             .annotate(revenue=Sum('total_amount')).order_by('day')[:366]),
+            ),
+            'posts': (
+                lambda: list(PostSales.objects.order_by('-revenue', '-id')[:50]),
+                lambda: list(OrderItem.objects.filter(order__in=counted_orders().order_by(), post__isnull=False)
+                             .values('post_id').annotate(revenue=REVENUE).order_by('-revenue')[:50]),
+            ),
+            'seller posts': (
+                lambda: list(PostSales.objects.filter(seller=seller).order_by('-revenue', '-id')[:50]),
+                lambda: list(OrderItem.objects.filter(order__in=counted_orders().order_by(), post__user=seller)
+                             .values('post_id').annotate(revenue=REVENUE).order_by('-revenue')[:50]),
+            ),
+            'sellers': (
+                lambda: list(SellerSales.objects.order_by('-revenue', '-id')[:50]),
+                lambda: list(OrderItem.objects.filter(order__in=counted_orders().order_by(), post__isnull=False)
+                             .values('post__user_id').annotate(revenue=REVENUE).order_by('-revenue')[:50]),
+            ),
+        }
+        print(f"{'report':<14}{'rollup ms':>10}{'orders ms':>11}{'speedup':>9}")
+        for name, (from_rollup, from_orders) in reports.items():
+            rollup_ms = best_of(args.runs, from_rollup)
+            orders_ms = best_of(args.runs, from_orders)
+            print(f'{name:<14}{rollup_ms:>10.2f}{orders_ms:>11.2f}{orders_ms / rollup_ms:>8.0f}x')
+    finally:
+        connection.close()
+        runner.teardown_databases(old_config)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Peak memory of parsing and validating a multi-image upload.
+
+Compares Django's default upload handlers with serializers.ImageField against
+StreamingUploadHandler with ImageHeaderField. Every mode runs in a fresh
+process so the peak RSS numbers don't leak into each other, tracemalloc only
+sees Python allocations, RSS also covers Pillow's buffers. The default
+handlers keep a request in memory while it is under
+FILE_UPLOAD_MAX_MEMORY_SIZE, so the default sizes stay just below it.
+Last, both fields are fed a small PNG that decodes to 144M pixels.
+
+    python scripts/benchmark_upload_memory.py --images 3 --width 1000 --height 750
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tracemalloc
+import warnings
+import django
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from PIL import Image
+from rest_framework import serializers
+from core.serializers import ImageHeaderField
+
+MODES = {
+    'default': (
+        ['django.core.files.uploadhandler.MemoryFileUploadHandler',
+         'django.core.files.uploadhandler.TemporaryFileUploadHandler'],
+        lambda: serializers.ImageField(max_length=1000000, allow_empty_file=False, use_url=False),
+    ),
+    'streaming': (
+        ['core.upload_handlers.StreamingUploadHandler'],
+        lambda: ImageHeaderField(max_length=1000000, allow_empty_file=False, use_url=False),
+    ),
+}
+
+
+def make_image(width, height):
+    # Noise barely compresses, so the files are about as large as real photos
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (width, height), os.urandom(width * height * 3)).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def make_bomb():
+    buffer = io.BytesIO()
+    Image.new('1', (12000, 12000)).save(buffer, 'PNG')
+    return SimpleUploadedFile('bomb.png', buffer.getvalue(), content_type='image/png')
+
+
+def accepts(field, file):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+        try:
+            field.run_validation(file)
+        except serializers.ValidationError:
+            return False
+    return True
+
+
+def max_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(mode, count, width, height):
+    handlers, build_field = MODES[mode]
+    content = make_image(width, height)
+    files = [SimpleUploadedFile(f'photo-{i}.jpg', content, content_type='image/jpeg') for i in range(count)]
+    request = RequestFactory().post('/api/posts/create/', {'caption': 'x', 'price': '1', 'uploaded_images': files})
+    field = build_field()
+
+    with override_settings(FILE_UPLOAD_HANDLERS=handlers):
+        tracemalloc.start()
+        uploads = request.FILES.getlist('uploaded_images')
+        for upload in uploads:
+            field.run_validation(upload)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        'file_mib': len(content) / 2 ** 20,
+        'traced_mib': peak / 2 ** 20,
+        'rss_mib': max_rss_mib(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', type=int, default=3)
+    parser.add_argument('--width', type=int, default=1000)
+    parser.add_argument('--height', type=int, default=750)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.images, args.width, args.height)))
+        return
+
+    print(f"{'handler':<12}{'images':>8}{'per file':>11}{'peak traced':>13}{'max rss':>10}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode, '--images', str(args.images),
+             '--width', str(args.width), '--height', str(args.height)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<12}{args.images:>8}{result['file_mib']:>9.1f}MB{result['traced_mib']:>11.1f}MB"
+              f"{result['rss_mib']:>8.1f}MB")
+
+    bomb = make_bomb()
+    print(f'\n{bomb.size / 1024:.0f}KB PNG of 12000x12000 pixels accepted:')
+    for mode, (_, build_field) in MODES.items():
+        bomb.seek(0)
+        print(f"{mode:<12}{'yes' if accepts(build_field(), bomb) else 'no':>8}")
+
+
+if __name__ == '__main__':
+    main()
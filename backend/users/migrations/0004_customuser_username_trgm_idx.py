@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("users", "0003_customuser_delivery_address_customuser_phone"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="customuser",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["username"], name="user_username_trgm_idx", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
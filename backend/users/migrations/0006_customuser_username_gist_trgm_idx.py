@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("users", "0005_image_variants"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="customuser",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["username"], name="user_username_gist_trgm_idx", opclasses=["gist_trgm_ops"]
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="customuser",
+            name="user_username_trgm_idx",
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
 import os
+from core.images import needs_variants, variant_url
 from core.storage_backends import get_profile_storage
 
 def user_profile_photo_path(instance, filename):
@@ -18,19 +20,41 @@ class CustomUser(AbstractUser):
     bio = models.TextField(max_length=500, blank=True)
     phone = models.CharField(max_length=20, blank=True)
     delivery_address = models.TextField(blank=True)
+    # Resized WebP copies of the profile photo, see core.images
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-date_joined']
+        indexes = [
+            # Typo tolerant seller suggestions (pg_trgm), GiST so it returns the closest first
+            GistIndex(fields=['username'], name='user_username_gist_trgm_idx', opclasses=['gist_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.username
 
     @property
     def profile_photo_processed(self):
-        if not self.profile_photo:
-            return None
-        path = str(self.profile_photo)
-        base, ext = os.path.splitext(path)
-        return f"images_profiles/{self.id}/profile-processed{ext}"
+        return variant_url(self.profile_photo.storage, self.photo_variants, 'processed')
+
+    @property
+    def profile_photo_thumbnail(self):
+        return variant_url(self.profile_photo.storage, self.photo_variants, 'thumbnail')
+
+    @property
+    def needs_variants(self):
+        return needs_variants(self.profile_photo, self.photo_variants)
+
+    def variant_stem(self):
+        # Profile photos share one name per extension, keep every user's variants apart
+        base = os.path.splitext(self.profile_photo.name)[0]
+        prefix = f'{self.pk}/'
+        return base if base.startswith(prefix) else prefix + base
+
+    def store_variants(self, variants):
+        if self.profile_photo.name != variants['source']:
+            return
+        self.photo_variants = variants
+        self.save(update_fields=['photo_variants'])
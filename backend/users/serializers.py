@@ -1,15 +1,28 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from core.serializers import AbsoluteURLField, ImageHeaderField, SparseFieldsMixin
+from core.uploads import read_uploads
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    profile_photo_processed = AbsoluteURLField()
+    profile_photo_thumbnail = AbsoluteURLField()
+
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'first_name', 'last_name', 'profile_photo', 'bio', 'phone', 'delivery_address')
+        fields = ('id', 'username', 'email', 'first_name', 'last_name', 'profile_photo', 'profile_photo_processed',
+                  'profile_photo_thumbnail', 'bio', 'phone', 'delivery_address')
         read_only_fields = ('id',)
 
+class UserSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Public seller details shown next to a post."""
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'profile_photo')
+        read_only_fields = fields
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)
@@ -29,7 +42,16 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    profile_photo = ImageHeaderField(required=False, allow_null=True)
+
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'profile_photo', 'bio', 'phone', 'delivery_address')
-        read_only_fields = ('id', 'username', 'email') 
\ No newline at end of file
+        read_only_fields = ('id', 'username', 'email') 
+
+class ProfilePhotoConfirmSerializer(serializers.Serializer):
+    upload_id = serializers.CharField()
+
+    def validate_upload_id(self, value):
+        storage = User._meta.get_field('profile_photo').storage
+        return read_uploads([value], self.context['request'].user, 'profile_photo', storage)[0]
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from core import images
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def mark_profile_photo_upload(sender, instance, **kwargs):
+    # Profile photos can be overwritten under the same name, so a new upload
+    # has to be noticed before the field commits it
+    photo = instance.profile_photo
+    instance._profile_photo_uploaded = bool(photo) and not photo._committed
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def generate_profile_photo_variants(sender, instance, **kwargs):
+    # Photos set by name (fixtures, admin scripts) are left to generate_image_variants
+    if instance.__dict__.pop('_profile_photo_uploaded', False):
+        images.schedule(instance, 'profile_photo', instance.variant_stem())
@@ -1,3 +1,30 @@
-from django.test import TestCase
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+from .models import CustomUser
 
-# Create your tests here.
+
+@override_settings(UPLOAD_MAX_FILE_SIZE=1024)
+class OversizedUploadTests(TestCase):
+    def upload(self):
+        return SimpleUploadedFile('photo.png', b'\x89PNG\r\n\x1a\n' + b'0' * 4096, content_type='image/png')
+
+    def test_file_fields_never_see_a_truncated_file(self):
+        request = RequestFactory().post('/', {'photo': self.upload()})
+        file = request.FILES['photo']
+        self.assertTrue(file.too_large)
+        self.assertEqual((file.size, file.read()), (0, b''))
+        with self.assertRaises(ValidationError):
+            forms.ImageField(required=False).clean(file)
+
+    def test_api_reports_too_large(self):
+        user = CustomUser.objects.create(username='user')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.patch('/api/users/profile/edit/', {'profile_photo': self.upload()}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('larger than 1024 bytes', response.data['profile_photo'][0])
+        user.refresh_from_db()
+        self.assertFalse(user.profile_photo)
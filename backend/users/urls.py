@@ -9,4 +9,6 @@ urlpatterns = [
     path('logout/', views.UserLogoutView.as_view(), name='logout'),
     path('profile/', views.UserProfileView.as_view(), name='profile'),
     path('profile/edit/', views.UserProfileEditView.as_view(), name='profile-edit'),
+    path('profile/photo/upload/', views.ProfilePhotoUploadView.as_view(), name='profile-photo-upload'),
+    path('profile/photo/confirm/', views.ProfilePhotoConfirmView.as_view(), name='profile-photo-confirm'),
 ] 
\ No newline at end of file
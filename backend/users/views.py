@@ -5,7 +5,10 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import login, logout
 from django.contrib.auth import get_user_model
-from .serializers import UserRegistrationSerializer, UserSerializer, UserProfileSerializer
+from core.images import schedule
+from core.serializers import UploadRequestSerializer
+from core.uploads import issue_upload, unique_upload_name
+from .serializers import ProfilePhotoConfirmSerializer, UserRegistrationSerializer, UserSerializer, UserProfileSerializer
 
 User = get_user_model()
 
@@ -59,3 +62,31 @@ class UserProfileEditView(generics.UpdateAPIView):
 
     def get_object(self):
         return self.request.user
+
+class ProfilePhotoUploadView(APIView):
+    """Phase one of a direct upload: a storage target for a new profile photo."""
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        serializer = UploadRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        content_type = serializer.validated_data['content_type']
+        storage = User._meta.get_field('profile_photo').storage
+        # Per user keys, profile storage on S3 overwrites same named files
+        name = f"{request.user.pk}/{unique_upload_name('profile-photo', content_type)}"
+        upload = issue_upload(request, storage, name, content_type, 'profile_photo')
+        return Response(upload, status=status.HTTP_201_CREATED)
+
+class ProfilePhotoConfirmView(APIView):
+    """Phase two: make the uploaded object the user's profile photo."""
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        serializer = ProfilePhotoConfirmSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        user.profile_photo = serializer.validated_data['upload_id']
+        user.save(update_fields=['profile_photo', 'updated_at'])
+        # Set by name, the upload signal doesn't see it as a new file
+        schedule(user, 'profile_photo', user.variant_stem())
+        return Response(UserSerializer(user, context={'request': request}).data)
@@ -1,4 +1,4 @@
-import React, { memo } from 'react';
+import React, { memo, useEffect } from 'react';
 import { Link as RouterLink, useNavigate } from 'react-router-dom';
 import {
     AppBar,
@@ -15,6 +15,7 @@ import {
 } from '@mui/icons-material';
 import { useAppSelector, useAppDispatch } from '../hooks/redux';
 import { logout } from '../store/slices/authSlice';
+import { fetchCartSummary } from '../store/slices/cartSlice';
 
 interface LayoutProps {
     children: React.ReactNode;
@@ -106,7 +107,14 @@ const Layout: React.FC<LayoutProps> = memo(({ children }) => {
     const navigate = useNavigate();
     const dispatch = useAppDispatch();
     const { user } = useAppSelector(state => state.auth);
-    const { cart } = useAppSelector(state => state.cart);
+    const { summary } = useAppSelector(state => state.cart);
+
+    useEffect(() => {
+        // The badge only needs counts, the full cart is loaded by the cart page
+        if (user) {
+            dispatch(fetchCartSummary());
+        }
+    }, [dispatch, user]);
 
     const handleLogout = async () => {
         await dispatch(logout());
@@ -119,7 +127,7 @@ const Layout: React.FC<LayoutProps> = memo(({ children }) => {
                 <Container maxWidth="lg">
                     <Navigation
                         user={user}
-                        cartItemCount={cart?.items?.length || 0}
+                        cartItemCount={summary?.item_count || 0}
                         onLogout={handleLogout}
                     />
                 </Container>
@@ -1,4 +1,4 @@
-import { useState, memo, useCallback } from 'react';
+import { useState, memo, useCallback, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useFormik } from 'formik';
 import * as Yup from 'yup';
@@ -43,6 +43,8 @@ const Checkout = () => {
     const { loading: orderLoading, error } = useAppSelector(state => state.orders);
     const { user } = useAppSelector(state => state.auth);
     const [submitError, setSubmitError] = useState<string | null>(null);
+    // Same key while the order is unchanged, so a resubmit after a lost response can't order twice
+    const attempt = useRef<{ payload: string; key: string } | null>(null);
 
     const handleSubmit = useCallback(async (values: CheckoutFormValues) => {
         setSubmitError(null);
@@ -57,8 +59,13 @@ const Checkout = () => {
             }
         };
 
+        const payload = JSON.stringify(orderData);
+        if (attempt.current?.payload !== payload) {
+            attempt.current = { payload, key: crypto.randomUUID() };
+        }
+
         try {
-            const result = await dispatch(checkout(orderData)).unwrap();
+            const result = await dispatch(checkout({ data: orderData, idempotencyKey: attempt.current.key })).unwrap();
             if (result?.id) {
                 navigate(`/orders/${result.id}`);
             } else {
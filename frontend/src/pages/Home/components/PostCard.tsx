@@ -27,6 +27,7 @@ import { useAppDispatch, useAppSelector } from '../../../hooks/redux';
 import { addToCart } from '../../../store/slices/cartSlice';
 import { deletePost } from '../../../store/slices/postsSlice';
 import { Post } from '../../../types';
+import { imageSrcSet, placeholderStyle } from '../../../utils/images';
 
 interface PostCardProps {
     post: Post;
@@ -122,9 +123,11 @@ const PostCard: React.FC<PostCardProps> = memo(({ post }) => {
                     <CardMedia
                         component="img"
                         height="300"
-                        image={post.images[0].image}
+                        image={post.images[0].processed_url ?? post.images[0].image}
+                        srcSet={imageSrcSet(post.images[0])}
+                        sizes="(max-width: 600px) 100vw, 400px"
                         alt={post.caption}
-                        sx={{ objectFit: 'cover', cursor: 'pointer' }}
+                        sx={{ objectFit: 'cover', cursor: 'pointer', ...placeholderStyle(post.images[0]) }}
                         onClick={handleImageClick}
                     />
                 )}
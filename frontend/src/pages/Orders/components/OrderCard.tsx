@@ -1,51 +1,43 @@
 import { memo } from 'react';
-import { Typography, Box, Paper, Grid } from '@mui/material';
-import { Order } from '../../../types';
+import { Link as RouterLink } from 'react-router-dom';
+import { Typography, Box, Paper, Link } from '@mui/material';
+import { OrderSummary } from '../../../types';
 import { formatDate } from '../../../utils/formatters';
-import OrderItemView from './OrderItemView';
 
 interface OrderCardProps {
-    order: Order;
+    order: OrderSummary;
 }
 
 const OrderCard = memo(({ order }: OrderCardProps) => (
-    <Paper elevation={3} sx={{ p: 3 }}>
-        <Box sx={{ mb: 2 }}>
-            <Typography variant="h6">
+    <Paper elevation={3} sx={{ p: 3, display: 'flex', gap: 3, alignItems: 'center' }}>
+        {order.thumbnail_url ? (
+            <Box
+                component="img"
+                src={order.thumbnail_url}
+                alt={`Order #${order.id}`}
+                loading="lazy"
+                sx={{ width: 64, height: 64, objectFit: 'cover', flexShrink: 0 }}
+            />
+        ) : (
+            <Box sx={{ width: 64, height: 64, bgcolor: 'grey.200', flexShrink: 0 }} />
+        )}
+
+        <Box sx={{ flexGrow: 1 }}>
+            <Link component={RouterLink} to={`/orders/${order.id}`} variant="h6" underline="hover">
                 Order #{order.id}
+            </Link>
+            <Typography variant="body2" color="text.secondary">
+                Ordered on: {formatDate(order.created_at)}
+            </Typography>
+            <Typography variant="body2" color="text.secondary">
+                {order.total_quantity} {order.total_quantity === 1 ? 'item' : 'items'} · {order.status.toUpperCase()}
             </Typography>
         </Box>
 
-        <Grid container spacing={2}>
-            <Grid item xs={12} sm={6}>
-                <Typography variant="body2" color="text.secondary">
-                    Ordered on: {formatDate(order.created_at)}
-                </Typography>
-                <Typography variant="body2" color="text.secondary">
-                    Payment Method: {(order.payment_method || '').replace('_', ' ').toUpperCase()}
-                </Typography>
-                <Typography variant="body2" color="text.secondary" sx={{ mt: 1 }}>
-                    Shipping Address:
-                </Typography>
-                <Typography variant="body2">
-                    {order.shipping_address}
-                </Typography>
-            </Grid>
-            <Grid item xs={12} sm={6}>
-                <Typography variant="subtitle2" gutterBottom>
-                    Order Items:
-                </Typography>
-                {order.items?.map((item) => (
-                    <OrderItemView key={item.id} item={item} />
-                ))}
-                <Box sx={{ display: 'flex', justifyContent: 'flex-end', mt: 2 }}>
-                    <Typography variant="h6">
-                        Total: ${Number(order.total_amount || 0).toFixed(2)}
-                    </Typography>
-                </Box>
-            </Grid>
-        </Grid>
+        <Typography variant="h6">
+            ${Number(order.total_amount || 0).toFixed(2)}
+        </Typography>
     </Paper>
 ));
 
-export default OrderCard; 
\ No newline at end of file
+export default OrderCard;
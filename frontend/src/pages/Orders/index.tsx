@@ -1,5 +1,5 @@
 import { useEffect, memo } from 'react';
-import { Container, Typography, Box, Grid, CircularProgress } from '@mui/material';
+import { Container, Typography, Box, Grid, CircularProgress, Button } from '@mui/material';
 import { useAppDispatch, useAppSelector } from '../../hooks/redux';
 import { fetchOrders } from '../../store/slices/ordersSlice';
 import FormError from '../../components/FormError';
@@ -8,7 +8,7 @@ import EmptyState from './components/EmptyState';
 
 const Orders = () => {
     const dispatch = useAppDispatch();
-    const { items: orders, loading, error } = useAppSelector(state => state.orders);
+    const { items: orders, nextCursor, loading, loadingMore, error } = useAppSelector(state => state.orders);
 
     useEffect(() => {
         dispatch(fetchOrders());
@@ -43,6 +43,18 @@ const Orders = () => {
                     </Grid>
                 ))}
             </Grid>
+
+            {nextCursor && (
+                <Box sx={{ display: 'flex', justifyContent: 'center', mt: 3 }}>
+                    <Button
+                        variant="outlined"
+                        disabled={loadingMore}
+                        onClick={() => dispatch(fetchOrders(nextCursor))}
+                    >
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </Button>
+                </Box>
+            )}
         </Container>
     );
 };
@@ -1,6 +1,7 @@
 import { memo } from 'react';
 import { Grid, Box } from '@mui/material';
 import { PostImage } from '../../../types';
+import { imageSrcSet, placeholderStyle } from '../../../utils/images';
 
 interface ImageGalleryProps {
     images: PostImage[];
@@ -32,11 +33,14 @@ const ImageGallery = memo(({ images }: ImageGalleryProps) => (
                 <Box
                     component="img"
                     src={image.image}
+                    srcSet={imageSrcSet(image)}
+                    sizes="(max-width: 600px) 33vw, 300px"
                     alt={`Product ${index + 1}`}
                     sx={{
                         width: '100%',
                         aspectRatio: '1',
                         objectFit: 'cover',
+                        ...placeholderStyle(image),
                     }}
                 />
             </Grid>
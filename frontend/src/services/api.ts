@@ -1,7 +1,7 @@
 import axios from 'axios';
-import { LoginCredentials, RegisterData, User, Post, Cart, Order } from '../types';
+import { LoginCredentials, RegisterData, User, Post, Cart, CartOperation, CartSummary, Order, OrderSummary } from '../types';
 
-const API_URL = 'http://localhost:8000/api';
+export const API_URL = 'http://localhost:8000/api';
 
 // Function to get CSRF token from cookies
 const getCSRFToken = () => {
@@ -70,8 +70,13 @@ export const postsAPI = {
 // Cart API
 export const cartAPI = {
     getCart: () => api.get<Cart>('/orders/cart/'),
+    // Counts and total only, for the header badge
+    getCartSummary: () => api.get<CartSummary>('/orders/cart/summary/'),
     addToCart: (post_id: number, quantity = 1) =>
         api.post<Cart>('/orders/cart/add/', { post_id, quantity }),
+    // Several add/set/remove operations in one request, answered with the resulting cart
+    batchUpdateCart: (operations: CartOperation[]) =>
+        api.post<Cart>('/orders/cart/batch/', { operations }),
     removeFromCart: (itemId: number) =>
         api.delete(`/orders/cart/remove/${itemId}/`),
     updateCartItem: async (itemId: number, quantity: number) => {
@@ -82,7 +87,9 @@ export const cartAPI = {
 
 // Orders API
 export const ordersAPI = {
-    getOrders: () => api.get<{ count: number; results: Order[] }>('/orders/'),
+    // Newest first, a page at a time, pass the cursor of the previous page for the next one
+    getOrders: (cursor?: string | null) =>
+        api.get<{ next: string | null; results: OrderSummary[] }>('/orders/', { params: cursor ? { cursor } : {} }),
     getOrder: (id: number) => api.get<Order>(`/orders/${id}/`),
     createOrder: async (data: {
         payment_method: string;
@@ -93,10 +100,12 @@ export const ordersAPI = {
             email: string;
             phone: string;
         }
-    }) => {
+    }, idempotencyKey?: string) => {
         try {
             console.log('Creating order with data:', data);
-            const response = await api.post<Order>('/orders/create/', data);
+            // A retry with the same key gets the first order back instead of placing another
+            const headers = idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined;
+            const response = await api.post<Order>('/orders/create/', data, { headers });
             console.log('Order creation response:', response.data);
             return response;
         } catch (error: any) {
@@ -1,19 +1,36 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
 import { cartAPI } from '../../services/api';
-import { Cart, CartItem } from '../../types';
+import { Cart, CartItem, CartOperation, CartSummary } from '../../types';
 
 interface CartState {
     cart: Cart | null;
+    summary: CartSummary | null;
     loading: boolean;
     error: string | null;
 }
 
 const initialState: CartState = {
     cart: null,
+    summary: null,
     loading: false,
     error: null,
 };
 
+// Keeps the badge in step with every full cart the API returns
+const summarize = (cart: Cart): CartSummary => ({
+    item_count: cart.items.length,
+    total_quantity: cart.items.reduce((total, item) => total + item.quantity, 0),
+    total_amount: Number(cart.total_amount),
+});
+
+export const fetchCartSummary = createAsyncThunk(
+    'cart/fetchCartSummary',
+    async () => {
+        const response = await cartAPI.getCartSummary();
+        return response.data;
+    }
+);
+
 export const fetchCart = createAsyncThunk(
     'cart/fetchCart',
     async () => {
@@ -30,6 +47,14 @@ export const addToCart = createAsyncThunk(
     }
 );
 
+export const batchUpdateCart = createAsyncThunk(
+    'cart/batchUpdateCart',
+    async (operations: CartOperation[]) => {
+        const response = await cartAPI.batchUpdateCart(operations);
+        return response.data;
+    }
+);
+
 export const removeFromCart = createAsyncThunk(
     'cart/removeFromCart',
     async (itemId: number) => {
@@ -47,10 +72,15 @@ const cartSlice = createSlice({
         },
         clearCart: (state) => {
             state.cart = null;
+            state.summary = null;
         },
     },
     extraReducers: (builder) => {
         builder
+            // Cart summary
+            .addCase(fetchCartSummary.fulfilled, (state, action) => {
+                state.summary = action.payload;
+            })
             // Fetch Cart
             .addCase(fetchCart.pending, (state) => {
                 state.loading = true;
@@ -59,6 +89,7 @@ const cartSlice = createSlice({
             .addCase(fetchCart.fulfilled, (state, action) => {
                 state.loading = false;
                 state.cart = action.payload;
+                state.summary = summarize(action.payload);
             })
             .addCase(fetchCart.rejected, (state, action) => {
                 state.loading = false;
@@ -72,11 +103,26 @@ const cartSlice = createSlice({
             .addCase(addToCart.fulfilled, (state, action) => {
                 state.loading = false;
                 state.cart = action.payload;
+                state.summary = summarize(action.payload);
             })
             .addCase(addToCart.rejected, (state, action) => {
                 state.loading = false;
                 state.error = action.error.message || 'Failed to add item to cart';
             })
+            // Batch update
+            .addCase(batchUpdateCart.pending, (state) => {
+                state.loading = true;
+                state.error = null;
+            })
+            .addCase(batchUpdateCart.fulfilled, (state, action) => {
+                state.loading = false;
+                state.cart = action.payload;
+                state.summary = summarize(action.payload);
+            })
+            .addCase(batchUpdateCart.rejected, (state, action) => {
+                state.loading = false;
+                state.error = action.error.message || 'Failed to update cart';
+            })
             // Remove from Cart
             .addCase(removeFromCart.pending, (state) => {
                 state.loading = true;
@@ -90,6 +136,7 @@ const cartSlice = createSlice({
                         (total, item) => total + (item.quantity * Number(item.post.price)),
                         0
                     );
+                    state.summary = summarize(state.cart);
                 }
             })
             .addCase(removeFromCart.rejected, (state, action) => {
@@ -1,26 +1,45 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
 import { ordersAPI } from '../../services/api';
-import { Order } from '../../types';
+import { Order, OrderSummary } from '../../types';
 
 interface OrdersState {
-    items: Order[];
+    items: OrderSummary[];
+    // Cursor of the next page of the order history, null on the last page
+    nextCursor: string | null;
     selectedOrder: Order | null;
     loading: boolean;
+    loadingMore: boolean;
     error: string | null;
 }
 
 const initialState: OrdersState = {
     items: [],
+    nextCursor: null,
     selectedOrder: null,
     loading: false,
+    loadingMore: false,
     error: null,
 };
 
+const summarizeOrder = (order: Order): OrderSummary => ({
+    id: order.id,
+    status: order.status,
+    payment_method: order.payment_method,
+    total_amount: order.total_amount,
+    item_count: order.items.length,
+    total_quantity: order.items.reduce((total, item) => total + item.quantity, 0),
+    thumbnail_url: order.items.find(item => item.post?.images?.length)?.post.images[0].thumbnail_url ?? null,
+    created_at: order.created_at,
+    updated_at: order.updated_at,
+});
+
+// Without a cursor the first page is loaded, with one the page is appended
 export const fetchOrders = createAsyncThunk(
     'orders/fetchOrders',
-    async () => {
-        const response = await ordersAPI.getOrders();
-        return response.data.results;
+    async (cursor: string | null | undefined = undefined) => {
+        const response = await ordersAPI.getOrders(cursor);
+        const { next, results } = response.data;
+        return { results, nextCursor: next ? new URL(next).searchParams.get('cursor') : null };
     }
 );
 
@@ -34,17 +53,20 @@ export const fetchOrder = createAsyncThunk(
 
 export const checkout = createAsyncThunk(
     'orders/checkout',
-    async (data: {
-        payment_method: string;
-        shipping_address: string;
-        contact_info: {
-            first_name: string;
-            last_name: string;
-            email: string;
-            phone: string;
-        }
+    async ({ data, idempotencyKey }: {
+        data: {
+            payment_method: string;
+            shipping_address: string;
+            contact_info: {
+                first_name: string;
+                last_name: string;
+                email: string;
+                phone: string;
+            }
+        };
+        idempotencyKey?: string;
     }) => {
-        const response = await ordersAPI.createOrder(data);
+        const response = await ordersAPI.createOrder(data, idempotencyKey);
         return response.data;
     }
 );
@@ -71,16 +93,25 @@ const ordersSlice = createSlice({
     extraReducers: (builder) => {
         builder
             // Fetch Orders
-            .addCase(fetchOrders.pending, (state) => {
-                state.loading = true;
+            .addCase(fetchOrders.pending, (state, action) => {
+                if (action.meta.arg) {
+                    state.loadingMore = true;
+                } else {
+                    state.loading = true;
+                }
                 state.error = null;
             })
             .addCase(fetchOrders.fulfilled, (state, action) => {
                 state.loading = false;
-                state.items = action.payload;
+                state.loadingMore = false;
+                state.items = action.meta.arg
+                    ? [...state.items, ...action.payload.results]
+                    : action.payload.results;
+                state.nextCursor = action.payload.nextCursor;
             })
             .addCase(fetchOrders.rejected, (state, action) => {
                 state.loading = false;
+                state.loadingMore = false;
                 state.error = action.error.message || 'Failed to fetch orders';
             })
             // Fetch Single Order
@@ -104,7 +135,7 @@ const ordersSlice = createSlice({
             .addCase(checkout.fulfilled, (state, action) => {
                 state.loading = false;
                 state.selectedOrder = action.payload;
-                state.items = [action.payload, ...state.items];
+                state.items = [summarizeOrder(action.payload), ...state.items];
             })
             .addCase(checkout.rejected, (state, action) => {
                 state.loading = false;
@@ -114,7 +145,7 @@ const ordersSlice = createSlice({
             .addCase(cancelOrder.fulfilled, (state, action) => {
                 const index = state.items.findIndex(order => order.id === action.payload.id);
                 if (index !== -1) {
-                    state.items[index] = action.payload;
+                    state.items[index] = summarizeOrder(action.payload);
                 }
                 if (state.selectedOrder?.id === action.payload.id) {
                     state.selectedOrder = action.payload;
@@ -5,6 +5,8 @@ export interface User {
     first_name: string;
     last_name: string;
     profile_photo?: string;
+    profile_photo_processed?: string | null;
+    profile_photo_thumbnail?: string | null;
     bio?: string;
     phone?: string;
     delivery_address?: string;
@@ -38,9 +40,21 @@ export interface Post {
 export interface PostImage {
     id: number;
     image: string;
+    processed_url?: string | null;
+    thumbnail_url?: string | null;
+    width?: number | null;
+    height?: number | null;
+    placeholder?: string;
+    version: string;
     order: number;
 }
 
+export interface CartOperation {
+    op: 'add' | 'set' | 'remove';
+    post_id: number;
+    quantity?: number;
+}
+
 export interface CartItem {
     id: number;
     post: Post;
@@ -56,6 +70,12 @@ export interface Cart {
     updated_at: string;
 }
 
+export interface CartSummary {
+    item_count: number;
+    total_quantity: number;
+    total_amount: number;
+}
+
 export interface Order {
     id: number;
     user: User;
@@ -74,6 +94,19 @@ export interface Order {
     updated_at: string;
 }
 
+// Order history row, the items come with the order itself
+export interface OrderSummary {
+    id: number;
+    status: Order['status'];
+    payment_method: Order['payment_method'];
+    total_amount: number;
+    item_count: number;
+    total_quantity: number;
+    thumbnail_url: string | null;
+    created_at: string;
+    updated_at: string;
+}
+
 export interface OrderItem {
     id: number;
     post: Post;
@@ -0,0 +1,19 @@
+import { API_URL } from '../services/api';
+import { PostImage } from '../types';
+
+// Must match IMAGE_RESIZE_WIDTHS on the backend
+export const RESIZE_WIDTHS = [160, 320, 640, 960, 1280, 1920];
+
+// Versioned by the stored image, so the responses are cached as immutable
+export const resizedImageUrl = (image: PostImage, width: number, format: 'webp' | 'jpg' = 'webp') =>
+    `${API_URL}/posts/images/${image.id}/${width}.${format}?v=${image.version}`;
+
+// Lets the browser pick the smallest derivative that covers the rendered size
+export const imageSrcSet = (image: PostImage) =>
+    RESIZE_WIDTHS.map((width) => `${resizedImageUrl(image, width)} ${width}w`).join(', ');
+
+// Blurred preview behind an image until it has loaded
+export const placeholderStyle = (image: PostImage) =>
+    image.placeholder
+        ? { backgroundImage: `url(${image.placeholder})`, backgroundSize: 'cover', backgroundPosition: 'center' }
+        : {};